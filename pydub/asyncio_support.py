@@ -0,0 +1,185 @@
+"""
+asyncio versions of AudioSegment.from_file(), AudioSegment(...).export() and
+mediainfo_json(), which run ffmpeg/avconv (and ffprobe) with
+asyncio.create_subprocess_exec() instead of blocking the event loop.
+
+Requires python 3.5+, so unlike the rest of pydub it isn't imported by
+default. When this module is imported AudioSegment.from_file_async() and
+AudioSegment(...).export_async() become available.
+"""
+import asyncio
+import os
+from io import BytesIO
+from functools import partial
+from subprocess import DEVNULL, PIPE
+from tempfile import NamedTemporaryFile
+
+from .audio_segment import AUDIO_FILE_EXT_ALIASES, PCM_FORMATS, AudioSegment, _fd_or_path_or_tempfile, _is_format
+from .exceptions import CouldntEncodeError
+from .logging_utils import log_conversion, log_subprocess_output
+from .utils import (
+    _cache_mediainfo,
+    _cached_mediainfo,
+    _mediainfo_cache_key,
+    _parse_probe_output,
+    _probe_command,
+    fsdecode,
+    register_pydub_effect,
+)
+
+
+async def _communicate(command, stdin_data=None):
+    """
+    Runs command, streaming stdin_data to its stdin while reading its
+    stdout and stderr. Returns (returncode, stdout, stderr)
+    """
+    process = await asyncio.create_subprocess_exec(
+        *command, stdin=DEVNULL if stdin_data is None else PIPE, stdout=PIPE, stderr=PIPE)
+    try:
+        p_out, p_err = await process.communicate(stdin_data)
+    except BaseException:
+        # cancelled, don't leave the converter running
+        if process.returncode is None:
+            process.kill()
+            await process.wait()
+        raise
+    return process.returncode, p_out, p_err
+
+
+async def mediainfo_json_async(filepath, read_ahead_limit=-1):
+    """
+    Same as mediainfo_json(), and shares its cache
+    """
+    key = _mediainfo_cache_key(filepath)
+    info = _cached_mediainfo(key)
+    if info is not None:
+        return info
+
+    command, _, stdin_data = _probe_command(filepath, read_ahead_limit)
+    _, output, stderr = await _communicate(command, stdin_data)
+    info = _parse_probe_output(output, stderr)
+    _cache_mediainfo(key, info)
+    return info
+
+
+async def from_file_async(cls, file, format=None, codec=None, parameters=None, start_second=None, duration=None,
+                          **kwargs):
+    """
+    Same as AudioSegment.from_file(), except the file is probed and decoded
+    without blocking the event loop.
+
+    wav and raw files (and files loaded through a DecodeCache) don't need a
+    converter, they're loaded in the event loop's default executor instead.
+    """
+    try:
+        filename = fsdecode(file)
+    except TypeError:
+        filename = None
+
+    if format:
+        format = format.lower()
+        format = AUDIO_FILE_EXT_ALIASES.get(format, format)
+
+    def is_format(f):
+        return _is_format(f, format, filename)
+
+    if kwargs.get('cache') is not None or is_format("wav") or is_format("raw") or is_format("pcm"):
+        loop = asyncio.get_event_loop()
+        return await loop.run_in_executor(
+            None, partial(cls.from_file, file, format, codec, parameters, start_second, duration, **kwargs))
+
+    file, close_file = _fd_or_path_or_tempfile(file, 'rb', tempfile=False)
+    if filename is None:
+        # the data is piped to both the prober and the converter (and probing
+        # closes file)
+        data = file.read()
+        if close_file:
+            file.close()
+        file, close_file = BytesIO(data), False
+
+    try:
+        read_ahead_limit = kwargs.get('read_ahead_limit', -1)
+        probe = kwargs.get('probe', True) or bool(codec)
+        info = None
+        if probe and not codec:
+            info = await mediainfo_json_async(filename or file, read_ahead_limit=read_ahead_limit)
+            if not info:
+                # let the converter tell us what the input is instead
+                probe = False
+            if filename is None:
+                file.seek(0)
+
+        conversion_command, _, stdin_data = cls._decode_command(
+            file, filename, format, codec, parameters, start_second, duration,
+            read_ahead_limit=read_ahead_limit, probe=probe, info=info, fast_seek=kwargs.get('fast_seek', False))
+
+        log_conversion(conversion_command)
+        returncode, p_out, p_err = await _communicate(conversion_command, stdin_data)
+
+        return cls._from_decoder_output(returncode, p_out, p_err, probe, kwargs.get('keep_24bit', False),
+                                        start_second, duration)
+    finally:
+        if close_file:
+            file.close()
+
+
+async def export_async(seg, out_f=None, format='mp3', codec=None, bitrate=None, parameters=None, tags=None,
+                       id3v2_version='4', cover=None):
+    """
+    Same as AudioSegment(...).export(), except the audio is encoded without
+    blocking the event loop.
+
+    The audio is streamed to the converter's stdin rather than written to a
+    temporary wav file first. raw and wav exports which don't need a converter
+    are written in the event loop's default executor.
+    """
+    if format == "raw" or (format == "wav" and codec is None and parameters is None):
+        loop = asyncio.get_event_loop()
+        return await loop.run_in_executor(
+            None, partial(seg.export, out_f, format, codec, bitrate, parameters, tags, id3v2_version, cover))
+
+    # float32 samples are exported as 32-bit ints
+    seg = seg.set_sample_format('int')
+
+    conversion_command = [
+        seg.converter,
+        '-y',  # always overwrite existing files
+        "-f", PCM_FORMATS[seg.sample_width],
+        "-ar", str(seg.frame_rate),
+        "-ac", str(seg.channels),
+        "-i", "-",  # input options (filename last)
+    ]
+    conversion_command += seg._encode_options(format, codec, bitrate, parameters, tags, id3v2_version, cover)
+
+    out_f, _ = _fd_or_path_or_tempfile(out_f, 'wb+')
+    out_f.seek(0)
+
+    # the output is written to a file since some formats (like mp4) need to
+    # seek in it
+    output = NamedTemporaryFile(mode="w+b", delete=False)
+    try:
+        conversion_command.append(output.name)
+        log_conversion(conversion_command)
+
+        returncode, p_out, p_err = await _communicate(conversion_command, seg._data)
+
+        log_subprocess_output(p_out)
+        log_subprocess_output(p_err)
+
+        if returncode != 0:
+            raise CouldntEncodeError(
+                "Encoding failed. ffmpeg/avlib returned error code: {0}\n\nCommand:{1}\n\nOutput from ffmpeg/avlib:\n\n{2}".format(
+                    returncode, conversion_command, p_err.decode(errors='ignore')))
+
+        output.seek(0)
+        out_f.write(output.read())
+    finally:
+        output.close()
+        os.unlink(output.name)
+
+    out_f.seek(0)
+    return out_f
+
+
+AudioSegment.from_file_async = classmethod(from_file_async)
+register_pydub_effect(export_async)
@@ -1,16 +1,24 @@
 from __future__ import division
 
 import array
+import io
+import math
+import mmap as mmap_lib
+import multiprocessing
+import operator
 import os
 import subprocess
-from tempfile import NamedTemporaryFile
+import threading
+import time
+from tempfile import NamedTemporaryFile, TemporaryFile
 import wave
 import sys
 import struct
 from .logging_utils import log_conversion, log_subprocess_output
-from .utils import mediainfo_json, fsdecode
+from .utils import mediainfo_json, fsdecode, get_input_audio_info
 import base64
-from collections import namedtuple
+from collections import deque, namedtuple
+from itertools import groupby
 
 try:
     from StringIO import StringIO
@@ -24,12 +32,18 @@ try:
 except:
     izip = zip
 
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
 from .utils import (
     _fd_or_path_or_tempfile,
     db_to_float,
     ratio_to_db,
     get_encoder_name,
     get_array_type,
+    get_min_max_value,
     audioop,
 )
 from .exceptions import (
@@ -48,6 +62,23 @@ if sys.version_info >= (3, 0):
     StringIO = BytesIO
 
 
+def _as_buffer(data):
+    """
+    Returns a memoryview of data, whose slices don't copy it. On python 2
+    audioop doesn't accept memoryviews, so data is returned as a plain
+    string there.
+    """
+    if sys.version_info[0] == 2:
+        if isinstance(data, memoryview):
+            return data.tobytes()
+        return data
+
+    data = memoryview(data)
+    if data.itemsize != 1:
+        data = data.cast('B')
+    return data
+
+
 class ClassPropertyDescriptor(object):
 
     def __init__(self, fget, fset=None):
@@ -84,9 +115,28 @@ AUDIO_FILE_EXT_ALIASES = {
     "wave": "wav",
 }
 
+# ffmpeg/avconv raw formats matching the way samples are stored in memory
+PCM_FORMATS = {
+    1: "s8",
+    2: "s16le",
+    3: "s24le",
+    4: "s32le",
+}
+
+# with fast_seek, from_file() seeks in the input to this many seconds before
+# start_second, and decodes from there, so the decoder has settled (and the
+# audio is the same as without fast_seek) by start_second
+FAST_SEEK_PREROLL = 1
+
 WavSubChunk = namedtuple('WavSubChunk', ['id', 'position', 'size'])
 WavData = namedtuple('WavData', ['audio_format', 'channels', 'sample_rate',
                                  'bits_per_sample', 'raw_data'])
+# the result of decoding one of the files of AudioSegment.from_files(),
+# either segment or error is None
+DecodeResult = namedtuple('DecodeResult', ['source', 'segment', 'error'])
+# the result of one of the exports of AudioSegment.export_many(), seconds
+# is how long the export took
+ExportResult = namedtuple('ExportResult', ['out_f', 'error', 'seconds'])
 
 
 def extract_wav_headers(data):
@@ -105,15 +155,7 @@ def extract_wav_headers(data):
     return subchunks
 
 
-def read_wav_audio(data, headers=None):
-    if not headers:
-        headers = extract_wav_headers(data)
-
-    fmt = [x for x in headers if x.id == b'fmt ']
-    if not fmt or fmt[0].size < 16:
-        raise CouldntDecodeError("Couldn't find fmt header in wav data")
-    fmt = fmt[0]
-    pos = fmt.position + 8
+def _read_wav_fmt(data, pos):
     audio_format = struct.unpack_from('<H', data[pos:pos + 2])[0]
     if audio_format != 1 and audio_format != 0xFFFE:
         raise CouldntDecodeError("Unknown audio format 0x%X in wav data" %
@@ -122,6 +164,19 @@ def read_wav_audio(data, headers=None):
     channels = struct.unpack_from('<H', data[pos + 2:pos + 4])[0]
     sample_rate = struct.unpack_from('<I', data[pos + 4:pos + 8])[0]
     bits_per_sample = struct.unpack_from('<H', data[pos + 14:pos + 16])[0]
+    return audio_format, channels, sample_rate, bits_per_sample
+
+
+def read_wav_audio(data, headers=None):
+    if not headers:
+        headers = extract_wav_headers(data)
+
+    fmt = [x for x in headers if x.id == b'fmt ']
+    if not fmt or fmt[0].size < 16:
+        raise CouldntDecodeError("Couldn't find fmt header in wav data")
+    fmt = fmt[0]
+    audio_format, channels, sample_rate, bits_per_sample = _read_wav_fmt(
+        data, fmt.position + 8)
 
     data_hdr = headers[-1]
     if data_hdr.id != b'data':
@@ -149,6 +204,445 @@ def fix_wav_headers(data):
     data[pos + 4:pos + 8] = struct.pack('<I', len(data) - pos - 8)
 
 
+def _read_exactly(stream, size):
+    """
+    Read size bytes from stream, returning fewer only at the end of the stream
+    (pipes and sockets may return short reads before then).
+    """
+    chunks = []
+    while size > 0:
+        chunk = stream.read(size)
+        if not chunk:
+            break
+        chunks.append(chunk)
+        size -= len(chunk)
+    return b''.join(chunks)
+
+
+def _read_wav_stream_headers(stream):
+    """
+    Reads the wav headers from the start of a stream (without reading any of
+    the audio data) and leaves the stream positioned at the first frame.
+
+    Returns (audio_format, channels, sample_rate, bits_per_sample, data_size)
+    where data_size is the size of the data subchunk reported by the header
+    (which is not reliable for piped output).
+    """
+    riff = _read_exactly(stream, 12)
+    fmt = None
+    for _ in range(10):
+        subchunk_header = _read_exactly(stream, 8)
+        if len(riff) < 12 or len(subchunk_header) < 8:
+            break
+        subchunk_id = subchunk_header[:4]
+        subchunk_size = struct.unpack_from('<I', subchunk_header[4:8])[0]
+
+        if subchunk_id == b'data':
+            if fmt is None:
+                break
+            return fmt + (subchunk_size,)
+
+        subchunk = _read_exactly(stream, subchunk_size)
+        if subchunk_id == b'fmt ':
+            if subchunk_size < 16:
+                break
+            fmt = _read_wav_fmt(subchunk, 0)
+
+    if fmt is None:
+        raise CouldntDecodeError("Couldn't find fmt header in wav data")
+    raise CouldntDecodeError("Couldn't find data header in wav data")
+
+
+def _seek_options(start_second, fast_seek=False):
+    """
+    Returns the (input, output) converter options which make decoding start
+    at start_second.
+    """
+    if start_second is None:
+        return [], []
+    if not fast_seek or start_second <= FAST_SEEK_PREROLL:
+        return [], ["-ss", str(start_second)]
+    return ["-ss", str(start_second - FAST_SEEK_PREROLL)], ["-ss", str(FAST_SEEK_PREROLL)]
+
+
+def _check_start_and_duration(start_second, duration):
+    if start_second is not None and start_second < 0:
+        raise ValueError("start_second must not be negative")
+    if duration is not None and duration < 0:
+        raise ValueError("duration must not be negative")
+
+
+def _slice_frames(frame_count, frame_rate, start_second=None, duration=None):
+    """
+    Returns the (start, end) frames of the audio from start_second lasting
+    duration seconds, the same ones slicing an AudioSegment of frame_count
+    frames by milliseconds selects (end may be past frame_count).
+    """
+    _check_start_and_duration(start_second, duration)
+    length = round(1000 * (frame_count / frame_rate))
+    start = start_second * 1000 if start_second is not None else 0
+    if duration is None:
+        end = length
+    elif start_second is None:
+        end = duration * 1000
+    else:
+        end = (start_second + duration) * 1000
+
+    start = min(start, length)
+    end = min(end, length)
+    return int(start * (frame_rate / 1000.0)), int(end * (frame_rate / 1000.0))
+
+
+def _is_format(f, format, filename):
+    f = f.lower()
+    if format == f:
+        return True
+
+    if filename:
+        return filename.lower().endswith(".{0}".format(f))
+
+    return False
+
+
+def _map_in_threads(fn, items, max_workers, max_pending, ordered=True):
+    """
+    Yields fn(item) for every item, calling it in max_workers threads. At
+    most max_pending items are taken from items before their results are
+    yielded, in the same order as items or (if ordered is False) as soon as
+    they're ready.
+    """
+    from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+
+    def next_results(pending):
+        if ordered:
+            return [pending.popleft().result()]
+        done, _ = wait(pending, return_when=FIRST_COMPLETED)
+        for future in done:
+            pending.remove(future)
+        return [future.result() for future in done]
+
+    pending = deque()
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        try:
+            for item in items:
+                pending.append(executor.submit(fn, item))
+                if len(pending) >= max_pending:
+                    for result in next_results(pending):
+                        yield result
+            while pending:
+                for result in next_results(pending):
+                    yield result
+        finally:
+            # the caller stopped iterating early
+            for future in pending:
+                future.cancel()
+
+
+def _decode_job(cls, source, kwargs):
+    try:
+        return DecodeResult(source, cls.from_file(source, **kwargs), None)
+    except Exception as e:
+        return DecodeResult(source, None, e)
+
+
+def _export_job(job):
+    segment, out_f = job[:2]
+    kwargs = job[2] if len(job) > 2 else {}
+
+    start = time.time()
+    try:
+        exported = segment.export(out_f, **kwargs)
+    except Exception as e:
+        return ExportResult(out_f, e, time.time() - start)
+
+    if out_f is None:
+        out_f = exported
+    elif exported is not out_f:
+        # export() opened out_f
+        exported.close()
+    return ExportResult(out_f, None, time.time() - start)
+
+
+def _feed_stdin(process, data):
+    try:
+        process.stdin.write(data)
+    except (IOError, OSError):
+        # the converter exited before reading all of its input, the error
+        # will be reported once it's return code is checked
+        pass
+    finally:
+        try:
+            process.stdin.close()
+        except (IOError, OSError):
+            pass
+
+
+# the byte which sign extends each possible most significant byte of a sample
+_SIGN_BYTES = bytes(bytearray([0] * 128 + [255] * 128))
+
+
+def _widen_24bit(data, shift=False):
+    """
+    Converts 24-bit samples to 32-bit ones, with the same values (sign
+    extended). With shift=True the samples are moved into the top 3 bytes
+    instead, with the sign repeated in the lowest byte (which is how 24-bit
+    audio is converted when it is loaded).
+    """
+    if isinstance(data, memoryview):
+        data = data.tobytes()
+    data = data[:len(data) - len(data) % 3]
+
+    high_bytes = data[2::3]
+    output = bytearray(len(data) // 3 * 4)
+    offset = 1 if shift else 0
+    output[offset::4] = data[0::3]
+    output[offset + 1::4] = data[1::3]
+    output[offset + 2::4] = high_bytes
+    output[0 if shift else 3::4] = high_bytes.translate(_SIGN_BYTES)
+    return bytes(output)
+
+
+def _narrow_to_24bit(data, shift=False):
+    """
+    Converts 32-bit samples (which fit in 24 bits) to 24-bit ones. With
+    shift=True the top 3 bytes of each sample are kept instead (dropping the
+    lowest byte).
+    """
+    if isinstance(data, memoryview):
+        data = data.tobytes()
+    output = bytearray(len(data) // 4 * 3)
+    offset = 1 if shift else 0
+    output[0::3] = data[offset::4]
+    output[1::3] = data[offset + 1::4]
+    output[2::3] = data[offset + 2::4]
+    return bytes(output)
+
+
+def _decoded_bits_per_sample(stream):
+    """
+    Returns the bits per sample to decode an audio stream (as described by
+    mediainfo_json() or get_input_audio_info()) to.
+    """
+    # This is a workaround for some ffprobe versions that always say
+    # that mp3/mp4/aac/webm/ogg files contain fltp samples
+    if (stream.get('sample_fmt') == 'fltp' and
+            stream.get('codec_name') in ['mp3', 'mp4', 'aac', 'webm', 'ogg']):
+        return 16
+    return stream.get('bits_per_sample')
+
+
+SAMPLE_FORMATS = ('int', 'float32')
+
+
+def _float_samples(data):
+    return np.frombuffer(data, dtype=np.float32)
+
+
+def _float32_to_int32(data, scale):
+    """
+    Scales float32 samples by scale and rounds (and clips) them to 32-bit ints
+    """
+    samples = _float_samples(data) * np.float32(scale)
+    np.rint(samples, out=samples)
+    # 2 ** 31 - 128 is the largest float32 below 2 ** 31
+    np.clip(samples, -2 ** 31, 2 ** 31 - 128, out=samples)
+    return samples.astype(np.int32)
+
+
+def _int_to_float32(samples, scale):
+    """
+    Converts integer samples (an array or raw 32-bit data) to float32 samples
+    divided by scale
+    """
+    if not isinstance(samples, (array.array, np.ndarray)):
+        samples = np.frombuffer(samples, dtype=np.int32)
+    output = np.asarray(samples).astype(np.float32)
+    output *= np.float32(1.0 / scale)
+    return output
+
+
+class _Float32Ops(object):
+    """
+    The audioop functions AudioSegment uses, for float32 samples. Nothing is
+    clipped, the width arguments are only there to match audioop.
+    """
+
+    @staticmethod
+    def mul(data, width, factor):
+        return (_float_samples(data) * factor).astype(np.float32).tobytes()
+
+    @staticmethod
+    def add(data1, data2, width):
+        return (_float_samples(data1) + _float_samples(data2)).tobytes()
+
+    @staticmethod
+    def bias(data, width, bias):
+        return (_float_samples(data) + bias).astype(np.float32).tobytes()
+
+    @staticmethod
+    def rms(data, width):
+        samples = _float_samples(data)
+        if not len(samples):
+            return 0.0
+        return float(np.sqrt(np.mean(np.square(samples, dtype=np.float64))))
+
+    @staticmethod
+    def max(data, width):
+        samples = _float_samples(data)
+        if not len(samples):
+            return 0.0
+        return float(np.max(np.abs(samples)))
+
+    @staticmethod
+    def avg(data, width):
+        samples = _float_samples(data)
+        if not len(samples):
+            return 0.0
+        return float(np.mean(samples, dtype=np.float64))
+
+    @staticmethod
+    def tomono(data, width, lfactor, rfactor):
+        frames = _float_samples(data).reshape(-1, 2)
+        mono = frames[:, 0] * lfactor + frames[:, 1] * rfactor
+        return mono.astype(np.float32).tobytes()
+
+    @staticmethod
+    def tostereo(data, width, lfactor, rfactor):
+        samples = _float_samples(data)
+        frames = np.empty((len(samples), 2), dtype=np.float32)
+        frames[:, 0] = samples * lfactor
+        frames[:, 1] = samples * rfactor
+        return frames.tobytes()
+
+
+def _sample_ops(sample_format):
+    """
+    Returns the audioop functions for samples in sample_format
+    """
+    return _Float32Ops if sample_format == 'float32' else audioop
+
+
+FADE_CURVES = ('linear', 'log', 'equal_power')
+
+
+def _fade_gains(from_gain, to_gain, fade_frames, curve='linear',
+                first_frame=0, frame_count=None, frame_rate=None):
+    """
+    Returns the gain (as a ratio) of each frame of a fade from from_gain to
+    to_gain dB which lasts fade_frames frames, starting at first_frame.
+
+    curve:
+        "linear" ramps the amplitude linearly, "log" ramps the gain in dB
+        linearly and "equal_power" ramps the power linearly
+
+    Without numpy, fades longer than 100ms (given the frame_rate) change the
+    gain once every millisecond rather than on every frame, so they can be
+    applied a millisecond at a time. Shorter fades would have audible clicks.
+    """
+    if curve not in FADE_CURVES:
+        raise ValueError("curve must be one of {0}".format(", ".join(FADE_CURVES)))
+    if frame_count is None:
+        frame_count = fade_frames - first_frame
+
+    from_power = db_to_float(from_gain)
+    to_power = db_to_float(to_gain)
+
+    if np is not None:
+        positions = np.arange(first_frame, first_frame + frame_count, dtype=np.float64)
+        if curve == 'linear':
+            return from_power + ((to_power - from_power) / fade_frames) * positions
+        if curve == 'log':
+            db = from_gain + ((to_gain - from_gain) / fade_frames) * positions
+            return np.power(10, db / 20)
+        return np.sqrt(from_power ** 2 +
+                       ((to_power ** 2 - from_power ** 2) / fade_frames) * positions)
+
+    step = 1
+    if frame_rate is not None and fade_frames > frame_rate // 10:
+        step = max(int(frame_rate // 1000), 1)
+    offset = first_frame % step
+    positions = xrange(first_frame - offset, first_frame + frame_count, step)
+
+    if curve == 'linear':
+        scale_step = (to_power - from_power) / fade_frames
+        gains = [from_power + (scale_step * i) for i in positions]
+    elif curve == 'log':
+        db_step = (to_gain - from_gain) / fade_frames
+        gains = [10 ** ((from_gain + (db_step * i)) / 20) for i in positions]
+    else:
+        power_step = (to_power ** 2 - from_power ** 2) / fade_frames
+        gains = [math.sqrt(from_power ** 2 + (power_step * i)) for i in positions]
+
+    if step == 1:
+        return gains
+
+    # every frame of a millisecond gets the gain of its first frame
+    frame_gains = []
+    for gain in gains:
+        frame_gains.extend([gain] * step)
+    return frame_gains[offset:offset + frame_count]
+
+
+def _fade_position(seg, start, end, duration):
+    """
+    Returns the first frame and the length in frames of a fade with the given
+    start, end and duration (in milliseconds, as passed to fade()), using the
+    same millisecond to frame rounding as slicing does.
+    """
+    start = min(len(seg), start) if start is not None else None
+    end = min(len(seg), end) if end is not None else None
+
+    if start is not None and start < 0:
+        start += len(seg)
+    if end is not None and end < 0:
+        end += len(seg)
+
+    if duration is not None and duration < 0:
+        raise InvalidDuration("duration must be a positive integer")
+
+    if duration:
+        if start is not None:
+            end = start + duration
+        elif end is not None:
+            start = end - duration
+    else:
+        duration = end - start
+
+    fade_start = int(seg.frame_count(ms=start))
+    fade_frames = max(int(seg.frame_count(ms=end)) - fade_start, 0)
+    return fade_start, fade_frames
+
+
+def _apply_frame_gains(data, sample_width, channels, gains, sample_format='int'):
+    """
+    Multiplies every frame of the raw audio data by the matching gain,
+    rounding and clipping the same way audioop.mul() does (float32 samples
+    are neither rounded nor clipped).
+    """
+    if sample_format == 'float32':
+        frames = _float_samples(data).reshape(-1, channels)
+        output = frames * np.asarray(gains, dtype=np.float32)[:, np.newaxis]
+        return output.tobytes()
+
+    if np is not None and sample_width != 3:
+        array_type = get_array_type(sample_width * 8)
+        minval, maxval = get_min_max_value(sample_width * 8)
+        frames = np.frombuffer(data, dtype=array_type).reshape(-1, channels)
+        output = np.floor(frames * np.asarray(gains)[:, np.newaxis])
+        np.clip(output, minval, maxval, out=output)
+        return output.astype(array_type).tobytes()
+
+    # one audioop.mul() for every run of frames with the same gain
+    frame_width = sample_width * channels
+    output = []
+    start = 0
+    for gain, run in groupby(gains):
+        end = start + len(list(run)) * frame_width
+        output.append(audioop.mul(data[start:end], sample_width, gain))
+        start = end
+    return b''.join(output)
+
+
 class AudioSegment(object):
     """
     AudioSegments are *immutable* objects representing segments of audio
@@ -176,7 +670,12 @@ class AudioSegment(object):
         "ogg": "libvorbis"
     }
 
+    # 'int' (integer PCM) or 'float32', see set_sample_format()
+    sample_format = 'int'
+
     def __init__(self, data=None, *args, **kwargs):
+        keep_24bit = kwargs.pop("keep_24bit", False)
+        sample_format = kwargs.pop("sample_format", 'int')
         self.sample_width = kwargs.pop("sample_width", None)
         self.frame_rate = kwargs.pop("frame_rate", None)
         self.channels = kwargs.pop("channels", None)
@@ -197,8 +696,13 @@ class AudioSegment(object):
         elif self.sample_width is not None:
             if len(data) % (self.sample_width * self.channels) != 0:
                 raise ValueError("data length must be a multiple of '(sample_width * channels)'")
+            if sample_format not in SAMPLE_FORMATS:
+                raise ValueError("sample_format must be one of {0}".format(", ".join(SAMPLE_FORMATS)))
+            if sample_format == 'float32' and self.sample_width != 4:
+                raise ValueError("float32 samples must have a sample_width of 4")
 
             self.frame_width = self.channels * self.sample_width
+            self.sample_format = sample_format
             self._data = data
 
         # keep support for 'metadata' until audio params are used everywhere
@@ -210,14 +714,15 @@ class AudioSegment(object):
         else:
             # normal construction
             try:
-                data = data if isinstance(data, (basestring, bytes)) else data.read()
+                data = data if isinstance(data, (basestring, bytes, memoryview)) else data.read()
             except(OSError):
-                d = b''
+                # some platforms can't read more than 2GB at once
+                chunks = []
                 reader = data.read(2 ** 31 - 1)
                 while reader:
-                    d += reader
+                    chunks.append(reader)
                     reader = data.read(2 ** 31 - 1)
-                data = d
+                data = b''.join(chunks)
 
             wav_data = read_wav_audio(data)
             if not wav_data:
@@ -232,26 +737,13 @@ class AudioSegment(object):
                 # convert from unsigned integers in wav
                 self._data = audioop.bias(self._data, 1, -128)
 
-        # Convert 24-bit audio to 32-bit audio.
-        # (stdlib audioop and array modules do not support 24-bit data)
-        if self.sample_width == 3:
-            byte_buffer = BytesIO()
-
-            # Workaround for python 2 vs python 3. _data in 2.x are length-1 strings,
-            # And in 3.x are ints.
-            pack_fmt = 'BBB' if isinstance(self._data[0], int) else 'ccc'
-
-            # This conversion maintains the 24 bit values.  The values are
-            # not scaled up to the 32 bit range.  Other conversions could be
-            # implemented.
-            i = iter(self._data)
-            padding = {False: b'\x00', True: b'\xFF'}
-            for b0, b1, b2 in izip(i, i, i):
-                byte_buffer.write(padding[b2 > b'\x7f'[0]])
-                old_bytes = struct.pack(pack_fmt, b0, b1, b2)
-                byte_buffer.write(old_bytes)
-
-            self._data = byte_buffer.getvalue()
+        # Convert 24-bit audio to 32-bit audio, unless it should be kept as is
+        # (the pure python audioop and the array module don't support 24-bit
+        # data)
+        if self.sample_width == 3 and not keep_24bit:
+            # This conversion maintains the 24 bit values in the upper 3
+            # bytes of each sample (which are padded with the sign).
+            self._data = _widen_24bit(self._data, shift=True)
             self.sample_width = 4
             self.frame_width = self.channels * self.sample_width
 
@@ -262,6 +754,8 @@ class AudioSegment(object):
         """
         public access to the raw audio data as a bytestring
         """
+        if isinstance(self._data, memoryview):
+            return self._data.tobytes()
         return self._data
 
     def get_array_of_samples(self, array_type_override=None):
@@ -270,10 +764,52 @@ class AudioSegment(object):
         """
         if array_type_override is None:
             array_type_override = self.array_type
+        if self.sample_width == 3:
+            # 24-bit samples are returned in 32-bit ints
+            samples = array.array(array_type_override)
+            try:
+                samples.frombytes(_widen_24bit(self._data))
+            except AttributeError:
+                samples.fromstring(_widen_24bit(self._data))
+            return samples
+        if isinstance(self._data, memoryview):
+            # array.array() would treat a memoryview as a sequence of ints
+            samples = array.array(array_type_override)
+            try:
+                samples.frombytes(self._data)
+            except AttributeError:
+                samples.fromstring(self._data.tobytes())
+            return samples
         return array.array(array_type_override, self._data)
 
+    def view(self):
+        """
+        Returns an AudioSegment which shares this segment's audio data rather
+        than holding a copy of it.
+
+        Slicing the returned segment (or slices of it) doesn't copy any audio
+        data, it is only materialized when raw_data is requested. On python 2
+        this returns the segment itself, since audioop can't operate on views.
+        """
+        if isinstance(self._data, memoryview) or sys.version_info[0] == 2:
+            return self
+
+        return self._spawn(_as_buffer(self._data))
+
+    def lazy(self):
+        """
+        Returns a LazySegment for this segment. Operations on it (slicing,
+        appending, gain changes, fades and overlays) are only recorded, and
+        the resulting audio is rendered once when it's needed, or chunk by
+        chunk when it's exported.
+        """
+        from .lazy import LazySegment
+        return LazySegment(self)
+
     @property
     def array_type(self):
+        if self.sample_format == 'float32':
+            return 'f'
         return get_array_type(self.sample_width * 8)
 
     def __len__(self):
@@ -289,7 +825,7 @@ class AudioSegment(object):
             return False
 
     def __hash__(self):
-        return hash(AudioSegment) ^ hash((self.channels, self.frame_rate, self.sample_width, self._data))
+        return hash(AudioSegment) ^ hash((self.channels, self.frame_rate, self.sample_width, self.raw_data))
 
     def __ne__(self, other):
         return not (self == other)
@@ -330,7 +866,7 @@ class AudioSegment(object):
                     "missing frames: %s" % missing_frames)
             silence = audioop.mul(data[:self.frame_width],
                                   self.sample_width, 0)
-            data += (silence * missing_frames)
+            data = b''.join((data, silence * missing_frames))
 
         return self._spawn(data)
 
@@ -397,7 +933,7 @@ class AudioSegment(object):
         if isinstance(arg, AudioSegment):
             return self.overlay(arg, position=0, loop=True)
         else:
-            return self._spawn(data=self._data * arg)
+            return self._spawn(data=self.raw_data * arg)
 
     def _spawn(self, data, overrides={}):
         """
@@ -406,15 +942,32 @@ class AudioSegment(object):
         being returned by an operation that would alters the current one,
         since AudioSegment objects are immutable.
         """
+        metadata = {
+            'sample_width': self.sample_width,
+            'frame_rate': self.frame_rate,
+            'frame_width': self.frame_width,
+            'channels': self.channels,
+            'sample_format': self.sample_format,
+        }
+        metadata.update(overrides)
+        keep_24bit = self.sample_width == 3 and metadata['sample_width'] == 3
+
         # accept lists of data chunks
         if isinstance(data, list):
             data = b''.join(data)
 
-        if isinstance(data, array.array):
+        if isinstance(data, memoryview) and sys.version_info[0] == 2:
+            data = _as_buffer(data)
+
+        if isinstance(data, array.array) or (np is not None and isinstance(data, np.ndarray)):
+            widened = keep_24bit and data.itemsize == 4
             try:
                 data = data.tobytes()
             except:
                 data = data.tostring()
+            # 24-bit samples are held in 32-bit ints (see get_array_of_samples)
+            if widened:
+                data = _narrow_to_24bit(data)
 
         # accept file-like objects
         if hasattr(data, 'read'):
@@ -422,13 +975,8 @@ class AudioSegment(object):
                 data.seek(0)
             data = data.read()
 
-        metadata = {
-            'sample_width': self.sample_width,
-            'frame_rate': self.frame_rate,
-            'frame_width': self.frame_width,
-            'channels': self.channels
-        }
-        metadata.update(overrides)
+        if keep_24bit:
+            return self.__class__(data=data, metadata=metadata, keep_24bit=True)
         return self.__class__(data=data, metadata=metadata)
 
     @classmethod
@@ -436,9 +984,11 @@ class AudioSegment(object):
         channels = max(seg.channels for seg in segs)
         frame_rate = max(seg.frame_rate for seg in segs)
         sample_width = max(seg.sample_width for seg in segs)
+        sample_format = 'float32' if any(seg.sample_format == 'float32' for seg in segs) else 'int'
 
         return tuple(
             seg.set_channels(channels).set_frame_rate(frame_rate).set_sample_width(sample_width)
+               .set_sample_format(sample_format)
             for seg in segs
         )
 
@@ -484,23 +1034,17 @@ class AudioSegment(object):
 
         channels = len(segs)
         sample_width = segs[0].sample_width
-        frame_rate = segs[0].frame_rate
 
         frame_count = max(int(seg.frame_count()) for seg in segs)
-        data = array.array(
-            segs[0].array_type,
-            b'\0' * (frame_count * sample_width * channels)
-        )
+        data = array.array(segs[0].array_type, [0]) * (frame_count * channels)
 
         for i, seg in enumerate(segs):
             data[i::channels] = seg.get_array_of_samples()
 
-        return cls(
-            data,
-            channels=channels,
-            sample_width=sample_width,
-            frame_rate=frame_rate,
-        )
+        return segs[0]._spawn(data, overrides={
+            'channels': channels,
+            'frame_width': channels * sample_width
+        })
 
     @classmethod
     def from_file_using_temporary_files(cls, file, format=None, codec=None, parameters=None, start_second=None, duration=None, **kwargs):
@@ -642,59 +1186,18 @@ class AudioSegment(object):
 
 
     @classmethod
-    def from_file(cls, file, format=None, codec=None, parameters=None, start_second=None, duration=None, **kwargs):
-        orig_file = file
-        try:
-            filename = fsdecode(file)
-        except TypeError:
-            filename = None
-        file, close_file = _fd_or_path_or_tempfile(file, 'rb', tempfile=False)
-
-        if format:
-            format = format.lower()
-            format = AUDIO_FILE_EXT_ALIASES.get(format, format)
-
-        def is_format(f):
-            f = f.lower()
-            if format == f:
-                return True
-
-            if filename:
-                return filename.lower().endswith(".{0}".format(f))
-
-            return False
-
-        if is_format("wav"):
-            try:
-                if start_second is None and duration is None:
-                    return cls._from_safe_wav(file)
-                elif start_second is not None and duration is None:
-                    return cls._from_safe_wav(file)[start_second*1000:]
-                elif start_second is None and duration is not None:
-                    return cls._from_safe_wav(file)[:duration*1000]
-                else:
-                    return cls._from_safe_wav(file)[start_second*1000:(start_second+duration)*1000]
-            except:
-                file.seek(0)
-        elif is_format("raw") or is_format("pcm"):
-            sample_width = kwargs['sample_width']
-            frame_rate = kwargs['frame_rate']
-            channels = kwargs['channels']
-            metadata = {
-                'sample_width': sample_width,
-                'frame_rate': frame_rate,
-                'channels': channels,
-                'frame_width': channels * sample_width
-            }
-            if start_second is None and duration is None:
-                return cls(data=file.read(), metadata=metadata)
-            elif start_second is not None and duration is None:
-                return cls(data=file.read(), metadata=metadata)[start_second*1000:]
-            elif start_second is None and duration is not None:
-                return cls(data=file.read(), metadata=metadata)[:duration*1000]
-            else:
-                return cls(data=file.read(), metadata=metadata)[start_second*1000:(start_second+duration)*1000]
-
+    def _decode_command(cls, file, filename, format=None, codec=None, parameters=None, start_second=None,
+                        duration=None, read_ahead_limit=-1, probe=True, info=None, fast_seek=False):
+        """
+        Builds the converter command used to decode file to wav on stdout.
+        Unless probe is False, the sample width to decode to is found with
+        mediainfo_json() (or from info, if file was probed already), otherwise
+        files are decoded to 32-bit samples. With fast_seek, the input is
+        seeked to (shortly before) start_second instead of being decoded
+        from the start.
+
+        Returns (conversion_command, stdin_parameter, stdin_data)
+        """
         conversion_command = [cls.converter,
                               '-y',  # always overwrite existing files
                               ]
@@ -708,7 +1211,9 @@ class AudioSegment(object):
             # force audio decoder
             conversion_command += ["-acodec", codec]
 
-        read_ahead_limit = kwargs.get('read_ahead_limit', -1)
+        input_seek, output_seek = _seek_options(start_second, fast_seek)
+        conversion_command += input_seek
+
         if filename:
             conversion_command += ["-i", filename]
             stdin_parameter = None
@@ -722,26 +1227,8 @@ class AudioSegment(object):
             stdin_parameter = subprocess.PIPE
             stdin_data = file.read()
 
-        if codec:
-            info = None
-        else:
-            info = mediainfo_json(orig_file, read_ahead_limit=read_ahead_limit)
-        if info:
-            audio_streams = [x for x in info['streams']
-                             if x['codec_type'] == 'audio']
-            # This is a workaround for some ffprobe versions that always say
-            # that mp3/mp4/aac/webm/ogg files contain fltp samples
-            audio_codec = audio_streams[0].get('codec_name')
-            if (audio_streams[0].get('sample_fmt') == 'fltp' and
-                    audio_codec in ['mp3', 'mp4', 'aac', 'webm', 'ogg']):
-                bits_per_sample = 16
-            else:
-                bits_per_sample = audio_streams[0]['bits_per_sample']
-            if bits_per_sample == 8:
-                acodec = 'pcm_u8'
-            else:
-                acodec = 'pcm_s%dle' % bits_per_sample
-
+        acodec = cls._decoded_codec(filename or file, codec, read_ahead_limit, probe, info)
+        if acodec:
             conversion_command += ["-acodec", acodec]
 
         conversion_command += [
@@ -749,8 +1236,7 @@ class AudioSegment(object):
             "-f", "wav"  # output options (filename last)
         ]
 
-        if start_second is not None:
-            conversion_command += ["-ss", str(start_second)]
+        conversion_command += output_seek
 
         if duration is not None:
             conversion_command += ["-t", str(duration)]
@@ -761,35 +1247,422 @@ class AudioSegment(object):
             # extend arguments with arbitrary set
             conversion_command.extend(parameters)
 
+        return conversion_command, stdin_parameter, stdin_data
+
+    @classmethod
+    def _decoded_codec(cls, file, codec=None, read_ahead_limit=-1, probe=True, info=None):
+        """
+        Returns the pcm codec file should be decoded with (None when codec
+        forces the decoder, so the converter picks the output codec).
+        """
+        if codec:
+            return None
+        if not probe:
+            return "pcm_s32le"
+        if info is None:
+            info = mediainfo_json(file, read_ahead_limit=read_ahead_limit)
+        if not info:
+            return None
+
+        audio_streams = [x for x in info['streams']
+                         if x['codec_type'] == 'audio']
+        bits_per_sample = _decoded_bits_per_sample(audio_streams[0])
+        if bits_per_sample == 8:
+            return 'pcm_u8'
+        return 'pcm_s%dle' % bits_per_sample
+
+    @classmethod
+    def from_file(cls, file, format=None, codec=None, parameters=None, start_second=None, duration=None, **kwargs):
+        """
+        Loads the audio of file (a path or a file object), decoding it with
+        ffmpeg/avconv unless it's wav or raw audio.
+
+        start_second, duration (float):
+            Only load the audio from start_second (default: the beginning)
+            lasting duration seconds (default: up to the end). A ValueError
+            is raised if either is negative. (Older versions took a negative
+            start_second of wav and raw files as an offset from the end, slice
+            the loaded segment to do that instead.)
+        """
+        # see pydub.cache.DecodeCache
+        cache = kwargs.pop('cache', None)
+        if cache is not None:
+            return cache.from_file(file, format, codec, parameters, start_second, duration, **kwargs)
+
+        try:
+            filename = fsdecode(file)
+        except TypeError:
+            filename = None
+        file, close_file = _fd_or_path_or_tempfile(file, 'rb', tempfile=False)
+
+        if format:
+            format = format.lower()
+            format = AUDIO_FILE_EXT_ALIASES.get(format, format)
+
+        def is_format(f):
+            return _is_format(f, format, filename)
+
+        keep_24bit = kwargs.get('keep_24bit', False)
+        _check_start_and_duration(start_second, duration)
+
+        if is_format("wav"):
+            use_mmap = kwargs.get('mmap', False)
+            try:
+                if start_second is None and duration is None:
+                    obj = cls._from_safe_wav(file, mmap=use_mmap, keep_24bit=keep_24bit)
+                else:
+                    # only read the part of the audio that's needed
+                    file.seek(0)
+                    header = _read_wav_stream_headers(file)
+                    obj = cls._read_pcm_range(file, header, start_second, duration, keep_24bit=keep_24bit)
+            except:
+                file.seek(0)
+            else:
+                if close_file:
+                    file.close()
+                return obj
+        elif is_format("raw") or is_format("pcm"):
+            sample_width = kwargs['sample_width']
+            frame_rate = kwargs['frame_rate']
+            channels = kwargs['channels']
+            metadata = {
+                'sample_width': sample_width,
+                'frame_rate': frame_rate,
+                'channels': channels,
+                'frame_width': channels * sample_width
+            }
+            if start_second is None and duration is None:
+                obj = cls(data=file.read(), metadata=metadata, keep_24bit=keep_24bit)
+            else:
+                header = (1, channels, frame_rate, sample_width * 8, None)
+                obj = cls._read_pcm_range(file, header, start_second, duration, unsigned_8bit=False,
+                                          keep_24bit=keep_24bit)
+            if close_file:
+                file.close()
+            return obj
+
+        probe = kwargs.get('probe', True) or bool(codec)
+        conversion_command, stdin_parameter, stdin_data = cls._decode_command(
+            file, filename, format, codec, parameters, start_second, duration,
+            read_ahead_limit=kwargs.get('read_ahead_limit', -1), probe=probe,
+            fast_seek=kwargs.get('fast_seek', False))
+
         log_conversion(conversion_command)
 
         p = subprocess.Popen(conversion_command, stdin=stdin_parameter,
                              stdout=subprocess.PIPE, stderr=subprocess.PIPE)
         p_out, p_err = p.communicate(input=stdin_data)
 
-        if p.returncode != 0 or len(p_out) == 0:
+        try:
+            return cls._from_decoder_output(p.returncode, p_out, p_err, probe, keep_24bit,
+                                            start_second, duration)
+        finally:
             if close_file:
                 file.close()
+
+    @classmethod
+    def _from_decoder_output(cls, returncode, p_out, p_err, probe, keep_24bit=False, start_second=None,
+                             duration=None, input_index=0):
+        """
+        Loads the wav audio written by a converter command from
+        _decode_command(), given its return code, stdout and stderr (for
+        commands with several inputs, input_index is the one p_out is from).
+        """
+        if returncode != 0 or len(p_out) == 0:
             raise CouldntDecodeError(
                 "Decoding failed. ffmpeg returned error code: {0}\n\nOutput from ffmpeg/avlib:\n\n{1}".format(
-                    p.returncode, p_err.decode(errors='ignore') ))
+                    returncode, p_err.decode(errors='ignore') ))
 
         p_out = bytearray(p_out)
         fix_wav_headers(p_out)
         p_out = bytes(p_out)
-        obj = cls(p_out)
-
-        if close_file:
-            file.close()
+        if probe:
+            obj = cls(p_out, keep_24bit=keep_24bit)
+        else:
+            obj = cls._from_32bit_decode(p_out, p_err, keep_24bit, input_index)
 
-        if start_second is None and duration is None:
-            return obj
-        elif start_second is not None and duration is None:
-            return obj[0:]
-        elif start_second is None and duration is not None:
+        if duration is not None:
+            # the converter already started at start_second
             return obj[:duration * 1000]
+        return obj
+
+    @classmethod
+    def from_files(cls, files, max_workers=None, ordered=True, **kwargs):
+        """
+        Decodes many files concurrently, yielding a DecodeResult(source,
+        segment, error) for each of them. Accepts the same keyword arguments
+        as from_file().
+
+        max_workers (int):
+            How many files are decoded at once (default: the number of CPUs).
+            Decoding happens in ffmpeg/avconv subprocesses, so threads are
+            used to wait on them.
+
+        ordered (bool):
+            Yield the results in the same order as files. Otherwise each one is
+            yielded as soon as it's decoded.
+
+        A file which can't be decoded doesn't stop the others, the exception
+        is returned as the error of its result (and segment is None). At most
+        2 * max_workers decoded files are held before they're yielded.
+        """
+        if max_workers is None:
+            max_workers = multiprocessing.cpu_count()
+
+        def decode(source):
+            return _decode_job(cls, source, kwargs)
+
+        return _map_in_threads(decode, files, max_workers, 2 * max_workers, ordered)
+
+    @classmethod
+    def _from_32bit_decode(cls, wav, stderr, keep_24bit=False, input_index=0):
+        """
+        Loads wav audio which was decoded to 32-bit samples, in the sample
+        width the input would have been decoded to after probing it (which
+        ffmpeg/avconv describes in stderr).
+        """
+        decoded = read_wav_audio(wav)
+        if not decoded:
+            raise CouldntDecodeError("Couldn't read wav audio from data")
+        data = decoded.raw_data
+
+        info = get_input_audio_info(stderr.decode(errors='ignore'), input_index)
+        bits_per_sample = _decoded_bits_per_sample(info) if info else None
+        if decoded.bits_per_sample != 32 or bits_per_sample not in (8, 16, 24):
+            return cls(wav, keep_24bit=keep_24bit)
+
+        sample_width = bits_per_sample // 8
+        if np is not None:
+            # round the same way ffmpeg does when it decodes to fewer bits
+            shift = 32 - bits_per_sample
+            samples = np.frombuffer(data, dtype=np.int32).astype(np.int64)
+            samples += 1 << (shift - 1)
+            samples >>= shift
+            minval, maxval = get_min_max_value(bits_per_sample)
+            np.clip(samples, minval, maxval, out=samples)
+            if sample_width == 3:
+                data = _narrow_to_24bit(samples.astype(np.int32).tobytes())
+            else:
+                data = samples.astype(get_array_type(bits_per_sample)).tobytes()
+        elif sample_width == 3:
+            data = _narrow_to_24bit(data, shift=True)
         else:
-            return obj[0:duration * 1000]
+            data = audioop.lin2lin(data, 4, sample_width)
+
+        return cls(data, sample_width=sample_width, frame_rate=decoded.sample_rate,
+                   channels=decoded.channels, keep_24bit=keep_24bit)
+
+    @classmethod
+    def iter_file(cls, file, chunk_ms=1000, format=None, codec=None, parameters=None, start_second=None,
+                  duration=None, **kwargs):
+        """
+        Decode an audio file incrementally, yielding AudioSegments that are
+        chunk_ms milliseconds long (the last one may be shorter).
+
+        Unlike from_file() the decoded audio is never held in memory all at
+        once, so this is suitable for very long inputs. Accepts the same
+        arguments as from_file().
+        """
+        _check_start_and_duration(start_second, duration)
+        try:
+            filename = fsdecode(file)
+        except TypeError:
+            filename = None
+        file, close_file = _fd_or_path_or_tempfile(file, 'rb', tempfile=False)
+
+        if format:
+            format = format.lower()
+            format = AUDIO_FILE_EXT_ALIASES.get(format, format)
+
+        def is_format(f):
+            return _is_format(f, format, filename)
+
+        keep_24bit = kwargs.get('keep_24bit', False)
+
+        try:
+            if is_format("wav"):
+                try:
+                    file.seek(0)
+                    header = _read_wav_stream_headers(file)
+                except CouldntDecodeError:
+                    file.seek(0)
+                else:
+                    chunks = cls._iter_pcm_chunks(file, header, chunk_ms, start_second, duration,
+                                                  keep_24bit=keep_24bit)
+                    for chunk in chunks:
+                        yield chunk
+                    return
+            elif is_format("raw") or is_format("pcm"):
+                sample_width = kwargs['sample_width']
+                header = (1, kwargs['channels'], kwargs['frame_rate'], sample_width * 8, None)
+                chunks = cls._iter_pcm_chunks(file, header, chunk_ms, start_second, duration,
+                                              unsigned_8bit=False, keep_24bit=keep_24bit)
+                for chunk in chunks:
+                    yield chunk
+                return
+
+            conversion_command, stdin_parameter, stdin_data = cls._decode_command(
+                file, filename, format, codec, parameters, start_second, duration,
+                read_ahead_limit=kwargs.get('read_ahead_limit', -1), fast_seek=kwargs.get('fast_seek', False))
+        finally:
+            if close_file:
+                file.close()
+
+        log_conversion(conversion_command)
+
+        p_err = TemporaryFile()
+        p = subprocess.Popen(conversion_command, stdin=stdin_parameter,
+                             stdout=subprocess.PIPE, stderr=p_err)
+        if stdin_data is not None:
+            feeder = threading.Thread(target=_feed_stdin, args=(p, stdin_data))
+            feeder.daemon = True
+            feeder.start()
+
+        def decoding_error():
+            p.wait()
+            p_err.seek(0)
+            return CouldntDecodeError(
+                "Decoding failed. ffmpeg returned error code: {0}\n\nOutput from ffmpeg/avlib:\n\n{1}".format(
+                    p.returncode, p_err.read().decode(errors='ignore')))
+
+        try:
+            try:
+                header = _read_wav_stream_headers(p.stdout)
+            except CouldntDecodeError:
+                raise decoding_error()
+
+            # the data size in the header of piped output is meaningless
+            header = header[:4] + (None,)
+            for chunk in cls._iter_pcm_chunks(p.stdout, header, chunk_ms, duration=duration,
+                                              keep_24bit=keep_24bit):
+                yield chunk
+
+            # discard anything past the requested duration so the converter
+            # isn't left blocked writing to a full pipe
+            while p.stdout.read(2 ** 16):
+                pass
+
+            if p.wait() != 0:
+                raise decoding_error()
+        finally:
+            if p.poll() is None:
+                # the caller stopped iterating before the end of the file
+                p.kill()
+                p.wait()
+            p.stdout.close()
+            p_err.seek(0)
+            log_subprocess_output(p_err.read())
+            p_err.close()
+
+    @classmethod
+    def _iter_pcm_chunks(cls, stream, header, chunk_ms, start_second=None, duration=None, unsigned_8bit=True,
+                         keep_24bit=False):
+        """
+        Yields AudioSegments of chunk_ms milliseconds read from a stream of
+        pcm data described by header (as returned by _read_wav_stream_headers).
+        A data size of None means the data runs to the end of the stream.
+        """
+        _, channels, frame_rate, bits_per_sample, data_size = header
+        sample_width = bits_per_sample // 8
+        frame_width = channels * sample_width
+        if not frame_width:
+            raise CouldntDecodeError("Couldn't read wav audio from data")
+
+        def frames_at(ms):
+            return int(ms * (frame_rate / 1000.0))
+
+        remaining = data_size // frame_width if data_size is not None else None
+
+        skip = frames_at(start_second * 1000) if start_second is not None else 0
+        if remaining is not None:
+            skip = min(skip, remaining)
+            remaining -= skip
+        if skip:
+            try:
+                stream.seek(skip * frame_width, io.SEEK_CUR)
+                skip = 0
+            except (AttributeError, IOError, OSError, ValueError):
+                # not seekable (like a pipe), read past it instead
+                pass
+        while skip:
+            skipped = len(_read_exactly(stream, min(skip, 2 ** 20) * frame_width)) // frame_width
+            if not skipped:
+                return
+            skip -= skipped
+
+        if duration is not None:
+            max_frames = frames_at(duration * 1000)
+            remaining = max_frames if remaining is None else min(remaining, max_frames)
+
+        chunk_frames = max(1, frames_at(chunk_ms))
+        while remaining is None or remaining > 0:
+            frames = chunk_frames if remaining is None else min(chunk_frames, remaining)
+            data = _read_exactly(stream, frames * frame_width)
+            # drop any trailing partial frame
+            data = data[:len(data) - (len(data) % frame_width)]
+            if not data:
+                return
+            if remaining is not None:
+                remaining -= len(data) // frame_width
+
+            if sample_width == 1 and unsigned_8bit:
+                # convert from unsigned integers in wav
+                data = audioop.bias(data, 1, -128)
+
+            yield cls(data=data, sample_width=sample_width, frame_rate=frame_rate, channels=channels,
+                      keep_24bit=keep_24bit)
+
+    @classmethod
+    def _read_pcm_range(cls, stream, header, start_second=None, duration=None, unsigned_8bit=True,
+                        keep_24bit=False):
+        """
+        Reads the audio from start_second lasting duration seconds from a
+        stream of pcm data described by header (see _iter_pcm_chunks), the
+        same audio reading all of it and slicing it would give. Seekable
+        streams are seeked to start_second, so only the audio which is
+        returned is read.
+        """
+        _, channels, frame_rate, bits_per_sample, data_size = header
+        sample_width = bits_per_sample // 8
+        frame_width = channels * sample_width
+        if not frame_width:
+            raise CouldntDecodeError("Couldn't read wav audio from data")
+
+        try:
+            data_start = stream.tell()
+            stream.seek(0, io.SEEK_END)
+            available = stream.tell() - data_start
+        except (AttributeError, IOError, OSError, ValueError):
+            # not seekable, read the rest of it
+            stream = BytesIO(stream.read())
+            data_start = 0
+            available = len(stream.getvalue())
+        if data_size is not None:
+            available = min(available, data_size)
+        frame_count = available // frame_width
+
+        start, end = _slice_frames(frame_count, frame_rate, start_second, duration)
+        stream.seek(data_start + start * frame_width)
+        data = _read_exactly(stream, max(min(end, frame_count) - start, 0) * frame_width)
+        data = data[:len(data) - (len(data) % frame_width)]
+
+        if sample_width == 1 and unsigned_8bit:
+            # convert from unsigned integers in wav
+            data = audioop.bias(data, 1, -128)
+
+        missing_frames = end - start - len(data) // frame_width
+        if missing_frames > 0 and data:
+            if missing_frames > frame_rate * 0.002:
+                raise TooManyMissingFrames(
+                    "You should never be filling in "
+                    "   more than 2 ms with silence here, "
+                    "missing frames: %s" % missing_frames)
+            # slicing pads the end with silence when the length in
+            # milliseconds is rounded up
+            data += b'\0' * (missing_frames * frame_width)
+
+        return cls(data=data, sample_width=sample_width, frame_rate=frame_rate, channels=channels,
+                   keep_24bit=keep_24bit)
 
     @classmethod
     def from_mp3(cls, file, parameters=None):
@@ -804,23 +1677,98 @@ class AudioSegment(object):
         return cls.from_file(file, 'ogg', parameters=parameters)
 
     @classmethod
-    def from_wav(cls, file, parameters=None):
-        return cls.from_file(file, 'wav', parameters=parameters)
+    def from_wav(cls, file, parameters=None, mmap=False, keep_24bit=False):
+        return cls.from_file(file, 'wav', parameters=parameters, mmap=mmap, keep_24bit=keep_24bit)
 
     @classmethod
     def from_raw(cls, file, **kwargs):
         return cls.from_file(file, 'raw', sample_width=kwargs['sample_width'], frame_rate=kwargs['frame_rate'],
-                             channels=kwargs['channels'])
+                             channels=kwargs['channels'], keep_24bit=kwargs.get('keep_24bit', False))
 
     @classmethod
-    def _from_safe_wav(cls, file):
+    def _from_safe_wav(cls, file, mmap=False, keep_24bit=False):
+        """
+        When mmap is True (and file is a real file) the audio data is memory
+        mapped instead of read, so only the portions which are actually used
+        are loaded from disk. 8 bit audio (and 24 bit audio, unless keep_24bit
+        is True) is always read since it has to be converted.
+        """
         file, close_file = _fd_or_path_or_tempfile(file, 'rb', tempfile=False)
         file.seek(0)
-        obj = cls(data=file)
+        data = file
+        if mmap:
+            try:
+                mapped = mmap_lib.mmap(file.fileno(), 0, access=mmap_lib.ACCESS_READ)
+            except (AttributeError, io.UnsupportedOperation, ValueError):
+                # not a real file (or an empty one), fall back to reading it
+                pass
+            else:
+                try:
+                    data = memoryview(mapped)
+                except TypeError:
+                    # python 2 can't make memoryviews of mmaps, read it instead
+                    mapped.close()
+        obj = cls(data=data, keep_24bit=keep_24bit)
         if close_file:
             file.close()
         return obj
 
+    @classmethod
+    def _encode_options(cls, format, codec=None, bitrate=None, parameters=None, tags=None, id3v2_version='4',
+                        cover=None):
+        """
+        Builds the converter options used to encode the (already specified)
+        input to format, these go right before the output file.
+        """
+        id3v2_allowed_versions = ['3', '4']
+        options = []
+
+        if codec is None:
+            codec = cls.DEFAULT_CODECS.get(format, None)
+
+        if cover is not None:
+            if cover.lower().endswith(('.png', '.jpg', '.jpeg', '.bmp', '.tif', '.tiff')) and format == "mp3":
+                options.extend(["-i", cover, "-map", "0", "-map", "1", "-c:v", "mjpeg"])
+            else:
+                raise AttributeError(
+                    "Currently cover images are only supported by MP3 files. The allowed image formats are: .tif, .jpg, .bmp, .jpeg and .png.")
+
+        if codec is not None:
+            # force audio encoder
+            options.extend(["-acodec", codec])
+
+        if bitrate is not None:
+            options.extend(["-b:a", bitrate])
+
+        if parameters is not None:
+            # extend arguments with arbitrary set
+            options.extend(parameters)
+
+        if tags is not None:
+            if not isinstance(tags, dict):
+                raise InvalidTag("Tags must be a dictionary.")
+            else:
+                # Extend converter command with tags
+                # print(tags)
+                for key, value in tags.items():
+                    options.extend(
+                        ['-metadata', '{0}={1}'.format(key, value)])
+
+                if format == 'mp3':
+                    # set id3v2 tag version
+                    if id3v2_version not in id3v2_allowed_versions:
+                        raise InvalidID3TagVersion(
+                            "id3v2_version not allowed, allowed versions: %s" % id3v2_allowed_versions)
+                    options.extend([
+                        "-id3v2_version", id3v2_version
+                    ])
+
+        if sys.platform == 'darwin' and codec == 'mp3':
+            options.extend(["-write_xing", "0"])
+
+        options.extend(["-f", format])
+        return options
+
     def export(self, out_f=None, format='mp3', codec=None, bitrate=None, parameters=None, tags=None, id3v2_version='4',
                cover=None):
         """
@@ -855,15 +1803,20 @@ class AudioSegment(object):
 
         cover (file)
             Set cover for audio file from image file. (png or jpg)
-        """
-        id3v2_allowed_versions = ['3', '4']
 
+        float32 segments are exported as 32-bit ints.
+        """
         if format == "raw" and (codec is not None or parameters is not None):
             raise AttributeError(
                     'Can not invoke ffmpeg when export format is "raw"; '
                     'specify an ffmpeg raw format like format="s16le" instead '
                     'or call export(format="raw") with no codec or parameters')
 
+        if self.sample_format == 'float32':
+            return self.set_sample_format('int').export(
+                out_f, format=format, codec=codec, bitrate=bitrate, parameters=parameters,
+                tags=tags, id3v2_version=id3v2_version, cover=cover)
+
         out_f, _ = _fd_or_path_or_tempfile(out_f, 'wb+')
         out_f.seek(0)
 
@@ -909,51 +1862,11 @@ class AudioSegment(object):
             "-f", "wav", "-i", data.name,  # input options (filename last)
         ]
 
-        if codec is None:
-            codec = self.DEFAULT_CODECS.get(format, None)
-
-        if cover is not None:
-            if cover.lower().endswith(('.png', '.jpg', '.jpeg', '.bmp', '.tif', '.tiff')) and format == "mp3":
-                conversion_command.extend(["-i", cover, "-map", "0", "-map", "1", "-c:v", "mjpeg"])
-            else:
-                raise AttributeError(
-                    "Currently cover images are only supported by MP3 files. The allowed image formats are: .tif, .jpg, .bmp, .jpeg and .png.")
-
-        if codec is not None:
-            # force audio encoder
-            conversion_command.extend(["-acodec", codec])
-
-        if bitrate is not None:
-            conversion_command.extend(["-b:a", bitrate])
-
-        if parameters is not None:
-            # extend arguments with arbitrary set
-            conversion_command.extend(parameters)
-
-        if tags is not None:
-            if not isinstance(tags, dict):
-                raise InvalidTag("Tags must be a dictionary.")
-            else:
-                # Extend converter command with tags
-                # print(tags)
-                for key, value in tags.items():
-                    conversion_command.extend(
-                        ['-metadata', '{0}={1}'.format(key, value)])
-
-                if format == 'mp3':
-                    # set id3v2 tag version
-                    if id3v2_version not in id3v2_allowed_versions:
-                        raise InvalidID3TagVersion(
-                            "id3v2_version not allowed, allowed versions: %s" % id3v2_allowed_versions)
-                    conversion_command.extend([
-                        "-id3v2_version", id3v2_version
-                    ])
-
-        if sys.platform == 'darwin' and codec == 'mp3':
-            conversion_command.extend(["-write_xing", "0"])
+        conversion_command += self._encode_options(format, codec, bitrate, parameters, tags, id3v2_version,
+                                                    cover)
 
         conversion_command.extend([
-            "-f", format, output.name,  # output options (filename last)
+            output.name,  # output options (filename last)
         ])
 
         log_conversion(conversion_command)
@@ -984,6 +1897,171 @@ class AudioSegment(object):
         out_f.seek(0)
         return out_f
 
+    @classmethod
+    def export_many(cls, jobs, max_workers=None, max_pending=None):
+        """
+        Runs many exports concurrently, returning an ExportResult(out_f,
+        error, seconds) for each of them in the same order as jobs.
+
+        jobs (iterable):
+            (segment, out_f) or (segment, out_f, kwargs) tuples, where kwargs
+            are the keyword arguments for segment.export(). segment can be
+            anything with an export() method (like a LazySegment or a Mixer).
+
+        max_workers (int):
+            How many exports run at once (default: the number of CPUs).
+
+        max_pending (int):
+            At most this many jobs (default: 2 * max_workers) are taken from
+            jobs before the earlier ones have finished, so if jobs is a
+            generator (which decodes or renders the segments) only that many
+            segments are held in memory at once.
+
+        An export which fails (with CouldntEncodeError or anything else)
+        doesn't stop the others, the exception is the error of its result.
+        Files opened by export() are closed, except when out_f is None,
+        then the out_f of the result is the exported (temporary) file.
+        """
+        if max_workers is None:
+            max_workers = multiprocessing.cpu_count()
+        if max_pending is None:
+            max_pending = 2 * max_workers
+
+        return list(_map_in_threads(_export_job, jobs, max_workers, max(max_pending, 1)))
+
+    @classmethod
+    def export_segments(cls, segments, out_f=None, format='mp3', codec=None, bitrate=None, parameters=None,
+                        tags=None, id3v2_version='4', cover=None):
+        """
+        Export an iterable of AudioSegments as a single file without holding
+        all of the audio in memory or writing any temporary files.
+
+        The audio is piped to ffmpeg/avconv as it is produced and the encoded
+        output is written to out_f as it becomes available. Every segment is
+        converted to the channels, frame rate and sample width of the first
+        one (float32 segments are converted to 32-bit ints first). Accepts
+        the same options as export(), however since the output is written
+        sequentially, formats which need to seek in their output (like mp4)
+        are not supported.
+        """
+        if format == "raw" and (codec is not None or parameters is not None):
+            raise AttributeError(
+                    'Can not invoke ffmpeg when export format is "raw"; '
+                    'specify an ffmpeg raw format like format="s16le" instead '
+                    'or call export(format="raw") with no codec or parameters')
+
+        segments = iter(segments)
+        try:
+            first = next(segments)
+        except StopIteration:
+            raise ValueError("At least one AudioSegment instance is required")
+        # float32 samples are exported as 32-bit ints
+        first = first.set_sample_format('int')
+
+        def pcm_chunks():
+            yield first._data
+            for seg in segments:
+                seg = seg.set_sample_format('int')
+                seg = seg.set_channels(first.channels)
+                seg = seg.set_frame_rate(first.frame_rate)
+                seg = seg.set_sample_width(first.sample_width)
+                yield seg._data
+
+        out_f, _ = _fd_or_path_or_tempfile(out_f, 'wb+')
+        out_f.seek(0)
+
+        if format == "raw":
+            for pcm in pcm_chunks():
+                out_f.write(pcm)
+            out_f.seek(0)
+            return out_f
+
+        # wav with no ffmpeg parameters can just be written directly to out_f
+        if format == "wav" and codec is None and parameters is None:
+            wave_data = wave.open(out_f, 'wb')
+            wave_data.setnchannels(first.channels)
+            wave_data.setsampwidth(first.sample_width)
+            wave_data.setframerate(first.frame_rate)
+            for pcm in pcm_chunks():
+                if first.sample_width == 1:
+                    # convert to unsigned integers for wav
+                    pcm = audioop.bias(pcm, 1, 128)
+                wave_data.writeframesraw(pcm)
+            # closing updates the header sizes (for seekable outputs)
+            wave_data.close()
+            out_f.seek(0)
+            return out_f
+
+        conversion_command = [
+            cls.converter,
+            '-y',  # always overwrite existing files
+            "-f", PCM_FORMATS[first.sample_width],
+            "-ar", str(first.frame_rate),
+            "-ac", str(first.channels),
+            "-i", "-",  # input options (filename last)
+        ]
+        conversion_command += cls._encode_options(format, codec, bitrate, parameters, tags, id3v2_version, cover)
+        conversion_command += ["-"]
+
+        log_conversion(conversion_command)
+
+        p_err = TemporaryFile()
+        p = subprocess.Popen(conversion_command, stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=p_err)
+
+        # copy the encoded output while we're still writing the input so
+        # neither pipe can fill up and block the converter
+        copy_errors = []
+
+        def copy_output():
+            try:
+                chunk = p.stdout.read(2 ** 16)
+                while chunk:
+                    out_f.write(chunk)
+                    chunk = p.stdout.read(2 ** 16)
+            except Exception as e:
+                copy_errors.append(e)
+                p.kill()
+
+        copier = threading.Thread(target=copy_output)
+        copier.daemon = True
+        copier.start()
+
+        try:
+            try:
+                for pcm in pcm_chunks():
+                    p.stdin.write(pcm)
+            except (IOError, OSError):
+                # the converter exited early, it's error output is reported below
+                pass
+            finally:
+                try:
+                    p.stdin.close()
+                except (IOError, OSError):
+                    pass
+        except BaseException:
+            p.kill()
+            raise
+        finally:
+            copier.join()
+            p.wait()
+            p.stdout.close()
+
+        p_err.seek(0)
+        p_err_output = p_err.read()
+        p_err.close()
+        log_subprocess_output(p_err_output)
+
+        if copy_errors:
+            raise copy_errors[0]
+
+        if p.returncode != 0:
+            raise CouldntEncodeError(
+                "Encoding failed. ffmpeg/avlib returned error code: {0}\n\nCommand:{1}\n\nOutput from ffmpeg/avlib:\n\n{2}".format(
+                    p.returncode, conversion_command, p_err_output.decode(errors='ignore')))
+
+        out_f.seek(0)
+        return out_f
+
     def get_frame(self, index):
         frame_start = index * self.frame_width
         frame_end = frame_start + self.frame_width
@@ -1003,6 +2081,10 @@ class AudioSegment(object):
         if sample_width == self.sample_width:
             return self
 
+        if self.sample_format == 'float32':
+            # other sample widths are always integers
+            return self.set_sample_format('int').set_sample_width(sample_width)
+
         frame_width = self.channels * sample_width
 
         return self._spawn(
@@ -1014,7 +2096,15 @@ class AudioSegment(object):
         if frame_rate == self.frame_rate:
             return self
 
-        if self._data:
+        if self._data and self.sample_format == 'float32':
+            # audioop.ratecv() only handles ints, so float samples are
+            # resampled as 32-bit ints with 24 bits (the precision of float32)
+            # below full scale, which leaves headroom for louder samples
+            data = _float32_to_int32(self._data, 2 ** 24).tobytes()
+            converted, _ = audioop.ratecv(data, 4, self.channels,
+                                          self.frame_rate, frame_rate, None)
+            converted = _int_to_float32(converted, 2 ** 24)
+        elif self._data:
             converted, _ = audioop.ratecv(self._data, self.sample_width,
                                           self.channels, self.frame_rate,
                                           frame_rate, None)
@@ -1024,30 +2114,65 @@ class AudioSegment(object):
         return self._spawn(data=converted,
                            overrides={'frame_rate': frame_rate})
 
+    def set_sample_format(self, sample_format):
+        """
+        Converts the samples to sample_format (requires numpy):
+
+        'int'
+            Integer PCM, which is how audio is decoded and exported. float32
+            samples are converted to 32-bit ints (and clipped to full scale).
+
+        'float32'
+            32-bit floats, where full scale is -1.0 to 1.0. Gain changes,
+            fades and overlays of float32 segments (and filters which work on
+            get_array_of_samples()) neither round nor clip the samples, so
+            a chain of effects only quantises the audio once, when it is
+            exported (as 32-bit ints) or converted back to 'int'.
+        """
+        if sample_format not in SAMPLE_FORMATS:
+            raise ValueError("sample_format must be one of {0}".format(", ".join(SAMPLE_FORMATS)))
+        if sample_format == self.sample_format:
+            return self
+        if np is None:
+            raise ImportError("float32 samples require numpy")
+
+        if sample_format == 'float32':
+            data = _int_to_float32(self.get_array_of_samples(), self.max_possible_amplitude)
+        else:
+            data = _float32_to_int32(self._data, 2 ** 31)
+
+        return self._spawn(data, overrides={
+            'sample_width': 4,
+            'frame_width': self.channels * 4,
+            'sample_format': sample_format,
+        })
+
     def set_channels(self, channels):
         if channels == self.channels:
             return self
 
+        ops = _sample_ops(self.sample_format)
         if channels == 2 and self.channels == 1:
-            fn = audioop.tostereo
+            fn = ops.tostereo
             frame_width = self.frame_width * 2
             fac = 1
             converted = fn(self._data, self.sample_width, fac, fac)
         elif channels == 1 and self.channels == 2:
-            fn = audioop.tomono
+            fn = ops.tomono
             frame_width = self.frame_width // 2
             fac = 0.5
             converted = fn(self._data, self.sample_width, fac, fac)
         elif channels == 1:
             channels_data = [seg.get_array_of_samples() for seg in self.split_to_mono()]
             frame_count = int(self.frame_count())
-            converted = array.array(
-                channels_data[0].typecode,
-                b'\0' * (frame_count * self.sample_width)
-            )
+            converted = array.array(channels_data[0].typecode, [0]) * frame_count
+            if self.sample_format == 'float32':
+                divide = operator.truediv
+            else:
+                divide = operator.floordiv
             for raw_channel_data in channels_data:
                 for i in range(frame_count):
-                    converted[i] += raw_channel_data[i] // self.channels
+                    converted[i] += divide(raw_channel_data[i], self.channels)
             frame_width = self.frame_width // self.channels
         elif self.channels == 1:
             dup_channels = [self for iChannel in range(channels)]
@@ -1071,20 +2196,16 @@ class AudioSegment(object):
         for i in range(self.channels):
             samples_for_current_channel = samples[i::self.channels]
 
-            try:
-                mono_data = samples_for_current_channel.tobytes()
-            except AttributeError:
-                mono_data = samples_for_current_channel.tostring()
-
             mono_channels.append(
-                self._spawn(mono_data, overrides={"channels": 1, "frame_width": self.sample_width})
+                self._spawn(samples_for_current_channel,
+                            overrides={"channels": 1, "frame_width": self.sample_width})
             )
 
         return mono_channels
 
     @property
     def rms(self):
-        return audioop.rms(self._data, self.sample_width)
+        return _sample_ops(self.sample_format).rms(self._data, self.sample_width)
 
     @property
     def dBFS(self):
@@ -1095,10 +2216,13 @@ class AudioSegment(object):
 
     @property
     def max(self):
-        return audioop.max(self._data, self.sample_width)
+        return _sample_ops(self.sample_format).max(self._data, self.sample_width)
 
     @property
     def max_possible_amplitude(self):
+        if self.sample_format == 'float32':
+            return 1.0
+
         bits = self.sample_width * 8
         max_possible_val = (2 ** bits)
 
@@ -1121,14 +2245,15 @@ class AudioSegment(object):
         if not 1 <= channel <= 2:
             raise ValueError("channel value must be 1 (left) or 2 (right)")
 
+        ops = _sample_ops(self.sample_format)
         if self.channels == 1:
             data = self._data
         elif channel == 1:
-            data = audioop.tomono(self._data, self.sample_width, 1, 0)
+            data = ops.tomono(self._data, self.sample_width, 1, 0)
         else:
-            data = audioop.tomono(self._data, self.sample_width, 0, 1)
+            data = ops.tomono(self._data, self.sample_width, 0, 1)
 
-        return float(audioop.avg(data, self.sample_width)) / self.max_possible_amplitude
+        return float(ops.avg(data, self.sample_width)) / self.max_possible_amplitude
 
     def remove_dc_offset(self, channel=None, offset=None):
         """
@@ -1142,19 +2267,22 @@ class AudioSegment(object):
         if offset and not -1.0 <= offset <= 1.0:
             raise ValueError("offset value must be in range -1.0 to 1.0")
 
-        if offset:
+        ops = _sample_ops(self.sample_format)
+        if offset and self.sample_format == 'float32':
+            offset = offset * self.max_possible_amplitude
+        elif offset:
             offset = int(round(offset * self.max_possible_amplitude))
 
         def remove_data_dc(data, off):
             if not off:
-                off = audioop.avg(data, self.sample_width)
-            return audioop.bias(data, self.sample_width, -off)
+                off = ops.avg(data, self.sample_width)
+            return ops.bias(data, self.sample_width, -off)
 
         if self.channels == 1:
             return self._spawn(data=remove_data_dc(self._data, offset))
 
-        left_channel = audioop.tomono(self._data, self.sample_width, 1, 0)
-        right_channel = audioop.tomono(self._data, self.sample_width, 0, 1)
+        left_channel = ops.tomono(self._data, self.sample_width, 1, 0)
+        right_channel = ops.tomono(self._data, self.sample_width, 0, 1)
 
         if not channel or channel == 1:
             left_channel = remove_data_dc(left_channel, offset)
@@ -1162,15 +2290,16 @@ class AudioSegment(object):
         if not channel or channel == 2:
             right_channel = remove_data_dc(right_channel, offset)
 
-        left_channel = audioop.tostereo(left_channel, self.sample_width, 1, 0)
-        right_channel = audioop.tostereo(right_channel, self.sample_width, 0, 1)
+        left_channel = ops.tostereo(left_channel, self.sample_width, 1, 0)
+        right_channel = ops.tostereo(right_channel, self.sample_width, 0, 1)
 
-        return self._spawn(data=audioop.add(left_channel, right_channel,
-                                            self.sample_width))
+        return self._spawn(data=ops.add(left_channel, right_channel,
+                                        self.sample_width))
 
     def apply_gain(self, volume_change):
-        return self._spawn(data=audioop.mul(self._data, self.sample_width,
-                                            db_to_float(float(volume_change))))
+        ops = _sample_ops(self.sample_format)
+        return self._spawn(data=ops.mul(self._data, self.sample_width,
+                                        db_to_float(float(volume_change))))
 
     def overlay(self, seg, position=0, loop=False, times=None, gain_during_overlay=None):
         """
@@ -1212,6 +2341,7 @@ class AudioSegment(object):
 
         seg1, seg2 = AudioSegment._sync(self, seg)
         sample_width = seg1.sample_width
+        ops = _sample_ops(seg1.sample_format)
         spawn = seg1._spawn
 
         output.write(seg1[:position]._data)
@@ -1233,12 +2363,12 @@ class AudioSegment(object):
 
             if gain_during_overlay:
                 seg1_overlaid = seg1[pos:pos + seg2_len]
-                seg1_adjusted_gain = audioop.mul(seg1_overlaid, self.sample_width,
-                                                 db_to_float(float(gain_during_overlay)))
-                output.write(audioop.add(seg1_adjusted_gain, seg2, sample_width))
+                seg1_adjusted_gain = ops.mul(seg1_overlaid, self.sample_width,
+                                             db_to_float(float(gain_during_overlay)))
+                output.write(ops.add(seg1_adjusted_gain, seg2, sample_width))
             else:
-                output.write(audioop.add(seg1[pos:pos + seg2_len], seg2,
-                                         sample_width))
+                output.write(ops.add(seg1[pos:pos + seg2_len], seg2,
+                                     sample_width))
             pos += seg2_len
 
             # dec times to break our while loop (eventually)
@@ -1252,7 +2382,7 @@ class AudioSegment(object):
         seg1, seg2 = AudioSegment._sync(self, seg)
 
         if not crossfade:
-            return seg1._spawn(seg1._data + seg2._data)
+            return seg1._spawn([seg1._data, seg2._data])
         elif crossfade > len(self):
             raise ValueError("Crossfade is longer than the original AudioSegment ({}ms > {}ms)".format(
                 crossfade, len(self)
@@ -1276,8 +2406,78 @@ class AudioSegment(object):
         output.close()
         return obj
 
+    @classmethod
+    def concatenate(cls, segments, crossfade=0):
+        """
+        Joins the segments one after the other, optionally crossfading
+        (in milliseconds) between each of them. The result is the same as
+        appending them one at a time, but the audio joined so far isn't
+        copied on every step.
+
+        All of the segments are converted to the highest channel count, frame
+        rate and sample width among them before they are joined.
+        """
+        segments = list(segments)
+        if not segments:
+            raise ValueError("At least one AudioSegment instance is required")
+
+        segments = [seg.view() for seg in cls._sync(*segments)]
+        first = segments[0]
+        if not crossfade:
+            return first._spawn([seg._data for seg in segments])
+
+        frame_rate = first.frame_rate
+        frame_width = first.frame_width
+
+        def frames_at(ms):
+            return int(ms * (frame_rate / 1000.0))
+
+        # work out where every crossfade goes, the same way append() does,
+        # so the whole output can be allocated at once
+        crossfade_starts = []
+        frame_count = int(first.frame_count())
+        for seg in segments[1:]:
+            length = round(1000 * (frame_count / frame_rate))
+            if crossfade > length:
+                raise ValueError("Crossfade is longer than the original AudioSegment ({}ms > {}ms)".format(
+                    crossfade, length
+                ))
+            elif crossfade > len(seg):
+                raise ValueError("Crossfade is longer than the appended AudioSegment ({}ms > {}ms)".format(
+                    crossfade, len(seg)
+                ))
+
+            crossfade_start = frames_at(length - crossfade)
+            crossfade_starts.append(crossfade_start)
+
+            # slicing by milliseconds may pad the crossfade, and overlaying on
+            # to it slices it again
+            crossfade_frames = frames_at(length) - crossfade_start
+            crossfade_frames = frames_at(round(1000 * (crossfade_frames / frame_rate)))
+            frame_count = crossfade_start + crossfade_frames + \
+                max(frames_at(len(seg)) - frames_at(crossfade), 0)
+
+        output = bytearray(frame_count * frame_width)
+        output_view = memoryview(output)
+
+        frame_count = int(first.frame_count())
+        output[:frame_count * frame_width] = first._data
+        for seg, crossfade_start in izip(segments[1:], crossfade_starts):
+            joined = first._spawn(output_view[:frame_count * frame_width])
+            xf = joined[-crossfade:].fade(to_gain=-120, start=0, end=float('inf'))
+            xf *= seg[:crossfade].fade(from_gain=-120, start=0, end=float('inf'))
+            rest = seg[crossfade:]._data
+
+            pos = crossfade_start * frame_width
+            output[pos:pos + len(xf._data)] = xf._data
+            pos += len(xf._data)
+            output[pos:pos + len(rest)] = rest
+            frame_count = (pos + len(rest)) // frame_width
+
+        return first._spawn(bytes(output))
+
     def fade(self, to_gain=0, from_gain=0, start=None, end=None,
-             duration=None):
+             duration=None, curve='linear'):
         """
         Fade the volume of this audio segment.
 
@@ -1295,90 +2495,69 @@ class AudioSegment(object):
         duration (int):
             default = until the end of the audio segment
             the duration of the fade
+
+        curve (str):
+            default = "linear"
+            the shape of the fade: "linear" (in amplitude), "log" (linear in
+            dB) or "equal_power"
         """
         if None not in [duration, end, start]:
             raise TypeError('Only two of the three arguments, "start", '
                             '"end", and "duration" may be specified')
 
+        if curve not in FADE_CURVES:
+            raise ValueError("curve must be one of {0}".format(", ".join(FADE_CURVES)))
+
         # no fade == the same audio
         if to_gain == 0 and from_gain == 0:
             return self
 
-        start = min(len(self), start) if start is not None else None
-        end = min(len(self), end) if end is not None else None
-
-        if start is not None and start < 0:
-            start += len(self)
-        if end is not None and end < 0:
-            end += len(self)
+        fade_start, fade_frames = _fade_position(self, start, end, duration)
+        frame_count = int(self.frame_count())
 
-        if duration is not None and duration < 0:
-            raise InvalidDuration("duration must be a positive integer")
-
-        if duration:
-            if start is not None:
-                end = start + duration
-            elif end is not None:
-                start = end - duration
-        else:
-            duration = end - start
-
-        from_power = db_to_float(from_gain)
+        # the fade may begin before or end after this segment
+        start_frame = min(max(fade_start, 0), frame_count)
+        end_frame = min(max(fade_start + fade_frames, start_frame), frame_count)
 
+        data = self.view()._data
+        frame_width = self.frame_width
+        ops = _sample_ops(self.sample_format)
         output = []
 
         # original data - up until the crossfade portion, as is
-        before_fade = self[:start]._data
+        before_fade = data[:start_frame * frame_width]
         if from_gain != 0:
-            before_fade = audioop.mul(before_fade,
-                                      self.sample_width,
-                                      from_power)
+            before_fade = ops.mul(before_fade,
+                                  self.sample_width,
+                                  db_to_float(from_gain))
         output.append(before_fade)
 
-        gain_delta = db_to_float(to_gain) - from_power
-
-        # fades longer than 100ms can use coarse fading (one gain step per ms),
-        # shorter fades will have audible clicks so they use precise fading
-        # (one gain step per sample)
-        if duration > 100:
-            scale_step = gain_delta / duration
-
-            for i in range(duration):
-                volume_change = from_power + (scale_step * i)
-                chunk = self[start + i]
-                chunk = audioop.mul(chunk._data,
-                                    self.sample_width,
-                                    volume_change)
-
-                output.append(chunk)
-        else:
-            start_frame = self.frame_count(ms=start)
-            end_frame = self.frame_count(ms=end)
-            fade_frames = end_frame - start_frame
-            scale_step = gain_delta / fade_frames
-
-            for i in range(int(fade_frames)):
-                volume_change = from_power + (scale_step * i)
-                sample = self.get_frame(int(start_frame + i))
-                sample = audioop.mul(sample, self.sample_width, volume_change)
-
-                output.append(sample)
+        if end_frame > start_frame:
+            gains = _fade_gains(from_gain, to_gain, fade_frames, curve,
+                                first_frame=start_frame - fade_start,
+                                frame_count=end_frame - start_frame,
+                                frame_rate=self.frame_rate)
+            output.append(_apply_frame_gains(
+                data[start_frame * frame_width:end_frame * frame_width],
+                self.sample_width, self.channels, gains, self.sample_format))
 
         # original data after the crossfade portion, at the new volume
-        after_fade = self[end:]._data
+        after_fade = data[end_frame * frame_width:]
         if to_gain != 0:
-            after_fade = audioop.mul(after_fade,
-                                     self.sample_width,
-                                     db_to_float(to_gain))
+            after_fade = ops.mul(after_fade,
+                                 self.sample_width,
+                                 db_to_float(to_gain))
         output.append(after_fade)
 
         return self._spawn(data=output)
 
-    def fade_out(self, duration):
-        return self.fade(to_gain=-120, duration=duration, end=float('inf'))
+    def fade_out(self, duration, curve='linear'):
+        return self.fade(to_gain=-120, duration=duration, end=float('inf'),
+                         curve=curve)
 
-    def fade_in(self, duration):
-        return self.fade(from_gain=-120, duration=duration, start=0)
+    def fade_in(self, duration, curve='linear'):
+        return self.fade(from_gain=-120, duration=duration, start=0,
+                         curve=curve)
 
     def reverse(self):
         return self._spawn(
@@ -0,0 +1,164 @@
+"""
+An on-disk cache of decoded audio.
+
+Decoding an mp3/aac/ogg file runs ffprobe and ffmpeg every time. A
+DecodeCache keeps the decoded audio of each file as a wav file in a cache
+directory, so loading the same file again is a memory mapped read of that
+wav without starting any subprocesses.
+"""
+import hashlib
+import os
+import threading
+from tempfile import NamedTemporaryFile
+
+from .audio_segment import AudioSegment
+from .exceptions import CouldntDecodeError
+from .utils import fsdecode
+
+# os.replace() overwrites existing files on windows too, but is python 3 only
+_replace = getattr(os, 'replace', os.rename)
+
+
+class DecodeCache(object):
+    """
+    Caches the decoded audio of AudioSegment.from_file() in directory.
+
+    directory (string):
+        Where the decoded audio is stored, it's created if it doesn't exist.
+        Several processes can share the same directory.
+
+    max_size (int):
+        The most bytes of decoded audio to keep, once it's exceeded the least
+        recently used files are removed. None means no limit.
+
+    hash_contents (bool):
+        Identify files by a hash of their contents rather than their path,
+        modification time and size. Changes to a file are detected even if
+        its modification time doesn't change, and copies of a file share the
+        same cached audio, however every file has to be read to be hashed.
+
+    Only files given by path are cached, file objects are decoded as usual.
+    """
+
+    def __init__(self, directory, max_size=2 ** 30, hash_contents=False):
+        self.directory = directory
+        self.max_size = max_size
+        self.hash_contents = hash_contents
+        self.hits = 0
+        self.misses = 0
+        # the counters are shared by every thread using this cache
+        self._lock = threading.Lock()
+
+        if not os.path.isdir(directory):
+            os.makedirs(directory)
+
+    def _key(self, filename, decode_args):
+        if self.hash_contents:
+            source = hashlib.sha1()
+            with open(filename, 'rb') as f:
+                for block in iter(lambda: f.read(2 ** 20), b''):
+                    source.update(block)
+            source = source.hexdigest()
+        else:
+            stat = os.stat(filename)
+            source = (os.path.abspath(filename), stat.st_mtime, stat.st_size)
+
+        key = repr((source, decode_args)).encode('utf-8')
+        return hashlib.sha1(key).hexdigest()
+
+    def _path(self, key):
+        return os.path.join(self.directory, key + '.wav')
+
+    def from_file(self, file, format=None, codec=None, parameters=None, start_second=None, duration=None,
+                  **kwargs):
+        """
+        Same as AudioSegment.from_file(), but the decoded audio is cached
+        """
+        try:
+            filename = fsdecode(file)
+        except TypeError:
+            filename = None
+
+        if filename is None or not os.path.isfile(filename):
+            return AudioSegment.from_file(file, format, codec, parameters, start_second, duration, **kwargs)
+
+        decode_args = (format, codec, parameters, start_second, duration, sorted(kwargs.items()))
+        path = self._path(self._key(filename, decode_args))
+
+        try:
+            seg = AudioSegment._from_safe_wav(path, mmap=True, keep_24bit=True)
+        except (IOError, OSError, CouldntDecodeError):
+            # not cached (or evicted by another process)
+            pass
+        else:
+            with self._lock:
+                self.hits += 1
+            try:
+                # mark it as recently used
+                os.utime(path, None)
+            except OSError:
+                pass
+            return seg
+
+        with self._lock:
+            self.misses += 1
+        seg = AudioSegment.from_file(file, format, codec, parameters, start_second, duration, **kwargs)
+        self._store(path, seg)
+        return seg
+
+    def _store(self, path, seg):
+        # write to a temporary file first, so other processes never see
+        # partially written audio
+        tmp = NamedTemporaryFile(dir=self.directory, suffix='.tmp', delete=False)
+        try:
+            with tmp:
+                seg.export(tmp, format='wav')
+            _replace(tmp.name, path)
+        except Exception:
+            os.remove(tmp.name)
+            raise
+
+        if self.max_size is not None:
+            self.evict(self.max_size)
+
+    def _entries(self):
+        entries = []
+        for name in os.listdir(self.directory):
+            if not name.endswith('.wav'):
+                continue
+            path = os.path.join(self.directory, name)
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+        return entries
+
+    def size(self):
+        """
+        Returns the size (in bytes) of the cached audio
+        """
+        return sum(size for _, size, _ in self._entries())
+
+    def evict(self, max_size):
+        """
+        Removes the least recently used files until the cached audio takes
+        at most max_size bytes.
+        """
+        entries = sorted(self._entries())
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in entries:
+            if total <= max_size:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                # already removed, or still open on windows
+                continue
+            total -= size
+
+    def clear(self):
+        """
+        Removes all of the cached audio
+        """
+        self.evict(0)
@@ -10,24 +10,39 @@ from .utils import (
     get_min_max_value
 )
 from .silence import split_on_silence
+from .audio_segment import _sample_ops
 from .exceptions import TooManyMissingFrames, InvalidDuration
 
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
 if sys.version_info >= (3, 0):
     xrange = range
 
 
 @register_pydub_effect
-def apply_mono_filter_to_each_channel(seg, filter_fn):
+def apply_mono_filter_to_each_channel(seg, filter_fn, max_workers=1):
+    """
+    filter_fn takes and returns a mono AudioSegment, with max_workers > 1 the
+    channels are filtered in that many threads (which only helps when
+    filter_fn releases the GIL, like numpy and scipy do).
+    """
     n_channels = seg.channels
 
     channel_segs = seg.split_to_mono()
-    channel_segs = [filter_fn(channel_seg) for channel_seg in channel_segs]
+    if max_workers > 1 and n_channels > 1:
+        from concurrent.futures import ThreadPoolExecutor
+        with ThreadPoolExecutor(max_workers=min(max_workers, n_channels)) as executor:
+            channel_segs = list(executor.map(filter_fn, channel_segs))
+    else:
+        channel_segs = [filter_fn(channel_seg) for channel_seg in channel_segs]
 
     out_data = seg.get_array_of_samples()
     for channel_i, channel_seg in enumerate(channel_segs):
-        for sample_i, sample in enumerate(channel_seg.get_array_of_samples()):
-            index = (sample_i * n_channels) + channel_i
-            out_data[index] = sample
+        samples = channel_seg.get_array_of_samples()
+        out_data[channel_i:len(samples) * n_channels:n_channels] = samples
 
     return seg._spawn(out_data)
 
@@ -86,9 +101,7 @@ def speedup(seg, playback_speed=1.5, chunk_size=150, crossfade=25):
     last_chunk = chunks[-1]
     chunks = [chunk[:-ms_to_remove_per_chunk] for chunk in chunks[:-1]]
 
-    out = chunks[0]
-    for chunk in chunks[1:]:
-        out = out.append(chunk, crossfade=crossfade)
+    out = seg.concatenate(chunks, crossfade=crossfade)
 
     out += last_chunk
     return out
@@ -105,11 +118,7 @@ def strip_silence(seg, silence_len=1000, silence_thresh=-16, padding=100):
     if not len(chunks):
         return seg[0:0]
 
-    seg = chunks[0]
-    for chunk in chunks[1:]:
-        seg = seg.append(chunk, crossfade=crossfade)
-
-    return seg
+    return seg.concatenate(chunks, crossfade=crossfade)
 
 
 @register_pydub_effect
@@ -145,8 +154,21 @@ def compress_dynamic_range(seg, threshold=-20.0, ratio=4.0, attack=5.0, release=
     thresh_rms = seg.max_possible_amplitude * db_to_float(threshold)
     
     look_frames = int(seg.frame_count(ms=attack))
+
+    # every frame's attenuation changes by a fraction of the attack/release
+    # time, so neither can be 0 (unless there are no frames at all)
+    if seg.frame_count() and not (seg.frame_count(ms=attack) and seg.frame_count(ms=release)):
+        raise ZeroDivisionError("attack and release must be longer than 0 frames")
+
+    if np is not None:
+        return _compress_dynamic_range_numpy(seg, thresh_rms, ratio, look_frames,
+                                             seg.frame_count(ms=attack),
+                                             seg.frame_count(ms=release))
+
+    # slices of a view don't copy the audio data
+    seg_view = seg.view()
     def rms_at(frame_i):
-        return seg.get_sample_slice(frame_i - look_frames, frame_i).rms
+        return seg_view.get_sample_slice(frame_i - look_frames, frame_i).rms
     def db_over_threshold(rms):
         if rms == 0: return 0.0
         db = ratio_to_db(rms / thresh_rms)
@@ -187,6 +209,74 @@ def compress_dynamic_range(seg, threshold=-20.0, ratio=4.0, attack=5.0, release=
     return seg._spawn(data=b''.join(output))
 
 
+def _compress_dynamic_range_numpy(seg, thresh_rms, ratio, look_frames, attack_frames, release_frames):
+    """
+    Same as compress_dynamic_range() but the rms of the window before each
+    frame comes from a cumulative sum of squares, and the gain is applied to
+    all frames at once.
+    """
+    samples = np.frombuffer(seg.get_array_of_samples(), dtype=seg.array_type)
+    frames = samples.reshape(-1, seg.channels)
+    frame_count = frames.shape[0]
+
+    is_float = seg.sample_format == 'float32'
+
+    # sums of squares are exact in 64 bit integers for up to 16 bit audio
+    sum_type = np.int64 if seg.sample_width <= 2 and not is_float else np.float64
+    squares = frames.astype(sum_type)
+    squares *= squares
+    cumulative = np.zeros(frame_count + 1, dtype=sum_type)
+    np.cumsum(squares.sum(axis=1), out=cumulative[1:])
+
+    # rms of the look_frames frames before each frame (matching audioop.rms)
+    ends = np.arange(frame_count)
+    starts = np.maximum(ends - look_frames, 0)
+    counts = (ends - starts) * seg.channels
+    window_sums = (cumulative[ends] - cumulative[starts]).astype(np.float64)
+    rms = np.zeros(frame_count)
+    np.divide(window_sums, counts, out=rms, where=counts > 0)
+    rms = np.sqrt(rms)
+    if not is_float:
+        rms = np.floor(rms)
+
+    db_over_threshold = np.zeros(frame_count)
+    np.log10(rms / thresh_rms, out=db_over_threshold, where=rms > 0)
+    db_over_threshold = np.maximum(db_over_threshold * 20, 0)
+    max_attenuation = (1 - (1.0 / ratio)) * db_over_threshold
+
+    # the attack/release envelope depends on its own previous value, so it is
+    # a (cheap) loop over plain floats
+    above_threshold = (rms > thresh_rms).tolist()
+    max_attenuation_list = max_attenuation.tolist()
+    attenuation_inc = (max_attenuation / attack_frames).tolist()
+    attenuation_dec = (max_attenuation / release_frames).tolist()
+    attenuations = [0.0] * frame_count
+
+    attenuation = 0.0
+    for i in xrange(frame_count):
+        max_att = max_attenuation_list[i]
+        if above_threshold[i] and attenuation <= max_att:
+            attenuation += attenuation_inc[i]
+            if attenuation > max_att:
+                attenuation = max_att
+        else:
+            attenuation -= attenuation_dec[i]
+            if attenuation < 0:
+                attenuation = 0
+        attenuations[i] = attenuation
+
+    gains = np.power(10, np.array(attenuations) / -20)
+    if is_float:
+        return seg._spawn(data=(frames * gains[:, np.newaxis]).astype(np.float32))
+
+    # round and clip the same way audioop.mul() does
+    minval, maxval = get_min_max_value(seg.sample_width * 8)
+    output = np.floor(frames * gains[:, np.newaxis])
+    np.clip(output, minval, maxval, out=output)
+
+    return seg._spawn(data=output.astype(seg.array_type))
+
+
 # Invert the phase of the signal.
 
 @register_pydub_effect
@@ -197,7 +287,8 @@ def invert_phase(seg, channels=(1, 1)):
     Note that mono AudioSegments will become stereo.
     """
     if channels == (1, 1):
-        inverted = audioop.mul(seg._data, seg.sample_width, -1.0)  
+        ops = _sample_ops(seg.sample_format)
+        inverted = ops.mul(seg._data, seg.sample_width, -1.0)
         return seg._spawn(data=inverted)
     
     else:
@@ -218,6 +309,76 @@ def invert_phase(seg, channels=(1, 1)):
 # High and low pass filters based on implementation found on Stack Overflow:
 #   http://stackoverflow.com/questions/13882038/implementing-simple-high-and-low-pass-filters-in-c
 
+# frames per block of the numpy one-pole filter
+_ONE_POLE_BLOCK = 64
+
+
+def _one_pole_filter(x, b, c, y0):
+    """
+    Returns y[i] = b * x[i] + c * y[i - 1] (where y[-1] is y0) for each
+    column (channel) of the 2d float64 array x.
+
+    Uses scipy.signal.lfilter when scipy is installed. Otherwise x is cut in
+    blocks, the response of each block (from a zero state) is a matrix
+    product, and the state carried between blocks is a one-pole filter of
+    its own (over a sequence _ONE_POLE_BLOCK times shorter).
+    """
+    try:
+        from scipy.signal import lfilter
+    except ImportError:
+        lfilter = None
+    if lfilter is not None:
+        return lfilter([b], [1.0, -c], x, axis=0, zi=c * y0[np.newaxis])[0]
+
+    n = len(x)
+    if n <= _ONE_POLE_BLOCK:
+        y = np.empty_like(x)
+        last_val = y0
+        for i in range(n):
+            last_val = b * x[i] + c * last_val
+            y[i] = last_val
+        return y
+
+    block = _ONE_POLE_BLOCK
+    block_count = -(-n // block)
+    blocks = np.zeros((block_count * block, x.shape[1]))
+    blocks[:n] = x
+    # (block, channel, frame)
+    blocks = blocks.reshape(block_count, block, x.shape[1]).transpose(0, 2, 1)
+
+    frames = np.arange(block)
+    lag = frames[np.newaxis, :] - frames[:, np.newaxis]
+    kernel = np.where(lag >= 0, b * c ** np.maximum(lag, 0), 0.0)
+    y = np.matmul(blocks, kernel)
+
+    # the state at the end of each block, each block starts from the last
+    ends = _one_pole_filter(y[:, :, -1], 1.0, c ** block, y0)
+    starts = np.concatenate([y0[np.newaxis], ends[:-1]])
+    y += starts[:, :, np.newaxis] * c ** (frames + 1)
+
+    return y.transpose(0, 2, 1).reshape(block_count * block, x.shape[1])[:n]
+
+
+def _use_numpy_filter(seg):
+    # 24-bit samples aren't supported by numpy
+    return np is not None and seg.sample_width != 3 and seg.frame_count() > 0
+
+
+def _samples_by_frame(seg):
+    dtype = np.float32 if seg.sample_format == 'float32' else seg.array_type
+    samples = np.frombuffer(seg.raw_data, dtype=dtype)
+    return samples.reshape(-1, seg.channels).astype(np.float64)
+
+
+def _spawn_filtered(seg, filtered, minval=None, maxval=None):
+    if seg.sample_format == 'float32':
+        return seg._spawn(data=filtered.astype(np.float32).tobytes())
+    if minval is not None:
+        np.clip(filtered, minval, maxval, out=filtered)
+    # ints are truncated
+    return seg._spawn(data=np.trunc(filtered).astype(seg.array_type).tobytes())
+
+
 @register_pydub_effect
 def low_pass_filter(seg, cutoff):
     """
@@ -228,21 +389,30 @@ def low_pass_filter(seg, cutoff):
     dt = 1.0 / seg.frame_rate
 
     alpha = dt / (RC + dt)
-    
+
+    if _use_numpy_filter(seg):
+        original = _samples_by_frame(seg)
+        filtered = np.empty_like(original)
+        filtered[0] = original[0]
+        filtered[1:] = _one_pole_filter(original[1:], alpha, 1.0 - alpha, original[0])
+        return _spawn_filtered(seg, filtered)
+
+    # float32 samples are stored as they are, ints are truncated
+    to_sample = float if seg.sample_format == 'float32' else int
+
     original = seg.get_array_of_samples()
     filteredArray = array.array(seg.array_type, original)
-    
-    frame_count = int(seg.frame_count())
-
-    last_val = [0] * seg.channels
-    for i in range(seg.channels):
-        last_val[i] = filteredArray[i] = original[i]
 
-    for i in range(1, frame_count):
-        for j in range(seg.channels):
-            offset = (i * seg.channels) + j
-            last_val[j] = last_val[j] + (alpha * (original[offset] - last_val[j]))
-            filteredArray[offset] = int(last_val[j])
+    for j in range(seg.channels):
+        samples = original[j::seg.channels]
+        if not samples:
+            break
+        last_val = samples[0]
+        filtered = [last_val]
+        for sample in samples[1:]:
+            last_val = last_val + (alpha * (sample - last_val))
+            filtered.append(to_sample(last_val))
+        filteredArray[j::seg.channels] = array.array(seg.array_type, filtered)
 
     return seg._spawn(data=filteredArray)
 
@@ -258,28 +428,38 @@ def high_pass_filter(seg, cutoff):
 
     alpha = RC / (RC + dt)
 
-    minval, maxval = get_min_max_value(seg.sample_width * 8)
-    
+    if seg.sample_format == 'float32':
+        # float32 samples aren't clipped
+        to_sample = float
+        minval, maxval = float('-inf'), float('inf')
+    else:
+        to_sample = int
+        minval, maxval = get_min_max_value(seg.sample_width * 8)
+
+    if _use_numpy_filter(seg):
+        original = _samples_by_frame(seg)
+        filtered = np.empty_like(original)
+        filtered[0] = original[0]
+        filtered[1:] = _one_pole_filter(np.diff(original, axis=0), alpha, alpha, original[0])
+        return _spawn_filtered(seg, filtered, minval, maxval)
+
     original = seg.get_array_of_samples()
     filteredArray = array.array(seg.array_type, original)
-    
-    frame_count = int(seg.frame_count())
 
-    last_val = [0] * seg.channels
-    for i in range(seg.channels):
-        last_val[i] = filteredArray[i] = original[i]
+    for j in range(seg.channels):
+        samples = original[j::seg.channels]
+        if not samples:
+            break
+        last_val = samples[0]
+        filtered = [last_val]
+        for previous, sample in zip(samples, samples[1:]):
+            last_val = alpha * (last_val + sample - previous)
+            filtered.append(to_sample(min(max(last_val, minval), maxval)))
+        filteredArray[j::seg.channels] = array.array(seg.array_type, filtered)
 
-    for i in range(1, frame_count):
-        for j in range(seg.channels):
-            offset = (i * seg.channels) + j
-            offset_minus_1 = ((i-1) * seg.channels) + j
+    return seg._spawn(data=filteredArray)
 
-            last_val[j] = alpha * (last_val[j] + original[offset] - original[offset_minus_1])
-            filteredArray[offset] = int(min(max(last_val[j], minval), maxval))
 
-    return seg._spawn(data=filteredArray)
-    
-    
 @register_pydub_effect
 def pan(seg, pan_amount):
     """
@@ -328,13 +508,14 @@ def apply_gain_stereo(seg, left_gain=0.0, right_gain=0.0):
     l_mult_factor = db_to_float(left_gain)
     r_mult_factor = db_to_float(right_gain)
     
-    left_data = audioop.mul(left._data, left.sample_width, l_mult_factor)
-    left_data = audioop.tostereo(left_data, left.sample_width, 1, 0)
+    ops = _sample_ops(seg.sample_format)
+    left_data = ops.mul(left._data, left.sample_width, l_mult_factor)
+    left_data = ops.tostereo(left_data, left.sample_width, 1, 0)
     
-    right_data = audioop.mul(right._data, right.sample_width, r_mult_factor)
-    right_data = audioop.tostereo(right_data, right.sample_width, 0, 1)
+    right_data = ops.mul(right._data, right.sample_width, r_mult_factor)
+    right_data = ops.tostereo(right_data, right.sample_width, 0, 1)
     
-    output = audioop.add(left_data, right_data, seg.sample_width)
+    output = ops.add(left_data, right_data, seg.sample_width)
     
     return seg._spawn(data=output,
                 overrides={'channels': 2,
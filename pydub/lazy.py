@@ -0,0 +1,510 @@
+"""
+Deferred rendering of AudioSegment operations.
+
+AudioSegment(...).lazy() returns a LazySegment, which supports slicing,
+appending, gain changes, fades and overlays just like an AudioSegment but
+only records them in a small graph. The audio is rendered once, when it is
+requested, or chunk by chunk while it's iterated over or exported.
+
+Consecutive gain changes and fades are fused, so the audio is multiplied
+(and rounded) once instead of after every step.
+"""
+from bisect import bisect_right
+from collections import namedtuple
+
+from .audio_segment import (
+    AudioSegment,
+    FADE_CURVES,
+    _apply_frame_gains,
+    _as_buffer,
+    _fade_gains,
+    _fade_position,
+    _sample_ops,
+)
+from .exceptions import TooManyMissingFrames
+from .utils import db_to_float
+
+
+# a gain change of from_gain dB before frame start, which fades to to_gain dB
+# over the following frames (a plain gain change has the same from/to gain)
+_GainStep = namedtuple('_GainStep', ['from_gain', 'to_gain', 'start', 'frames', 'curve'])
+
+
+class _Node(object):
+    """
+    A node of the graph. render(start, end) returns the raw audio of frames
+    start up to end, where 0 <= start <= end <= frame_count.
+    """
+
+    def __init__(self, frame_rate, channels, sample_width, frame_count,
+                 sample_format='int'):
+        self.frame_rate = frame_rate
+        self.channels = channels
+        self.sample_width = sample_width
+        self.frame_count = frame_count
+        self.sample_format = sample_format
+
+    @property
+    def frame_width(self):
+        return self.channels * self.sample_width
+
+    @property
+    def format(self):
+        return (self.channels, self.frame_rate, self.sample_width, self.sample_format)
+
+    @property
+    def ops(self):
+        return _sample_ops(self.sample_format)
+
+    def render(self, start, end):
+        raise NotImplementedError
+
+    def to_segment(self, start=0, end=None):
+        if end is None:
+            end = self.frame_count
+        return AudioSegment(data=self.render(start, end),
+                            sample_width=self.sample_width,
+                            frame_rate=self.frame_rate,
+                            channels=self.channels,
+                            sample_format=self.sample_format,
+                            keep_24bit=self.sample_width == 3)
+
+
+class _Source(_Node):
+
+    def __init__(self, segment):
+        super(_Source, self).__init__(segment.frame_rate, segment.channels,
+                                      segment.sample_width,
+                                      int(segment.frame_count()),
+                                      segment.sample_format)
+        self.data = segment.view()._data
+
+    def render(self, start, end):
+        return self.data[start * self.frame_width:end * self.frame_width]
+
+
+class _Concat(_Node):
+
+    def __init__(self, children):
+        flattened = []
+        for child in children:
+            if isinstance(child, _Concat):
+                flattened.extend(child.children)
+            elif child.frame_count:
+                flattened.append(child)
+
+        self.children = flattened
+        self.offsets = []
+        frame_count = 0
+        for child in flattened:
+            self.offsets.append(frame_count)
+            frame_count += child.frame_count
+
+        first = children[0]
+        super(_Concat, self).__init__(first.frame_rate, first.channels,
+                                      first.sample_width, frame_count,
+                                      first.sample_format)
+
+    def render(self, start, end):
+        output = []
+        i = bisect_right(self.offsets, start) - 1
+        while start < end:
+            child, offset = self.children[i], self.offsets[i]
+            stop = min(end, offset + child.frame_count)
+            output.append(child.render(start - offset, stop - offset))
+            start = stop
+            i += 1
+        return b''.join(output)
+
+
+class _Slice(_Node):
+    """
+    frame_count frames of child, from frame start. Frames past the end of
+    child are silent.
+    """
+
+    def __init__(self, child, start, frame_count):
+        super(_Slice, self).__init__(child.frame_rate, child.channels,
+                                     child.sample_width, frame_count,
+                                     child.sample_format)
+        self.child = child
+        self.start = start
+
+    def render(self, start, end):
+        start += self.start
+        end += self.start
+        stop = max(min(end, self.child.frame_count), start)
+
+        data = self.child.render(start, stop) if stop > start else b''
+        if end > stop:
+            data = b''.join((data, b'\0' * ((end - stop) * self.frame_width)))
+        return data
+
+
+class _Gain(_Node):
+
+    def __init__(self, child, steps):
+        super(_Gain, self).__init__(child.frame_rate, child.channels,
+                                    child.sample_width, child.frame_count,
+                                    child.sample_format)
+        self.child = child
+        self.steps = steps
+
+    def render(self, start, end):
+        data = _as_buffer(self.child.render(start, end))
+        frame_width = self.frame_width
+
+        # split the range where any fade starts or ends, so each part either
+        # has a constant gain or needs a gain per frame
+        bounds = set([start, end])
+        for step in self.steps:
+            bounds.update(b for b in (step.start, step.start + step.frames)
+                          if start < b < end)
+        bounds = sorted(bounds)
+
+        output = []
+        for part_start, part_end in zip(bounds, bounds[1:]):
+            part = data[(part_start - start) * frame_width:(part_end - start) * frame_width]
+
+            factor = 1.0
+            gains = None
+            for step in self.steps:
+                if part_end <= step.start:
+                    factor *= db_to_float(step.from_gain)
+                elif part_start >= step.start + step.frames:
+                    factor *= db_to_float(step.to_gain)
+                else:
+                    step_gains = _fade_gains(step.from_gain, step.to_gain,
+                                             step.frames, step.curve,
+                                             first_frame=part_start - step.start,
+                                             frame_count=part_end - part_start,
+                                             frame_rate=self.frame_rate)
+                    gains = step_gains if gains is None else _multiply(gains, step_gains)
+
+            if gains is not None:
+                if factor != 1.0:
+                    gains = _multiply(gains, factor)
+                part = _apply_frame_gains(part, self.sample_width, self.channels,
+                                          gains, self.sample_format)
+            elif factor != 1.0:
+                part = self.ops.mul(part, self.sample_width, factor)
+            output.append(part)
+
+        return b''.join(output)
+
+
+def _multiply(gains, other):
+    if not isinstance(gains, list):
+        # numpy arrays
+        return gains * other
+    if isinstance(other, list):
+        return [a * b for a, b in zip(gains, other)]
+    return [gain * other for gain in gains]
+
+
+class _Overlay(_Node):
+    """
+    other overlaid on base (and looped) for frame_count frames starting at
+    position
+    """
+
+    def __init__(self, base, other, position, frame_count, gain_during_overlay):
+        super(_Overlay, self).__init__(base.frame_rate, base.channels,
+                                       base.sample_width, base.frame_count,
+                                       base.sample_format)
+        self.base = base
+        self.other = other
+        self.position = position
+        self.overlay_frames = frame_count
+        self.gain_during_overlay = gain_during_overlay
+
+    def render(self, start, end):
+        data = self.base.render(start, end)
+        overlay_start = max(start, self.position)
+        overlay_end = min(end, self.position + self.overlay_frames)
+        if overlay_start >= overlay_end:
+            return data
+
+        frame_width = self.frame_width
+        data = _as_buffer(data)
+        before = data[:(overlay_start - start) * frame_width]
+        overlaid = data[(overlay_start - start) * frame_width:(overlay_end - start) * frame_width]
+        after = data[(overlay_end - start) * frame_width:]
+
+        if self.gain_during_overlay:
+            overlaid = self.ops.mul(overlaid, self.sample_width,
+                                   db_to_float(float(self.gain_during_overlay)))
+
+        pieces = []
+        pos = overlay_start
+        while pos < overlay_end:
+            offset = (pos - self.position) % self.other.frame_count
+            stop = min(overlay_end, pos + self.other.frame_count - offset)
+            pieces.append(self.other.render(offset, offset + stop - pos))
+            pos = stop
+
+        overlaid = self.ops.add(overlaid, b''.join(pieces), self.sample_width)
+        return b''.join((before, overlaid, after))
+
+
+def _node_of(seg):
+    if isinstance(seg, LazySegment):
+        return seg._node
+    return _Source(seg)
+
+
+def _sync(*nodes):
+    """
+    Same as AudioSegment._sync(), nodes with a different format are rendered
+    and converted.
+    """
+    channels = max(node.channels for node in nodes)
+    frame_rate = max(node.frame_rate for node in nodes)
+    sample_width = max(node.sample_width for node in nodes)
+    sample_format = 'float32' if any(node.sample_format == 'float32' for node in nodes) else 'int'
+
+    synced = []
+    for node in nodes:
+        if node.format != (channels, frame_rate, sample_width, sample_format):
+            seg = node.to_segment()
+            seg = seg.set_channels(channels).set_frame_rate(frame_rate).set_sample_width(sample_width)
+            seg = seg.set_sample_format(sample_format)
+            node = _Source(seg)
+        synced.append(node)
+    return tuple(synced)
+
+
+class LazySegment(object):
+    """
+    An AudioSegment whose operations are recorded rather than applied, see
+    AudioSegment.lazy(). Use render() (or raw_data, iter_chunks() or
+    export()) to get the resulting audio.
+    """
+
+    def __init__(self, segment):
+        if isinstance(segment, AudioSegment):
+            segment = _Source(segment)
+        self._node = segment
+
+    @property
+    def frame_rate(self):
+        return self._node.frame_rate
+
+    @property
+    def channels(self):
+        return self._node.channels
+
+    @property
+    def sample_width(self):
+        return self._node.sample_width
+
+    @property
+    def sample_format(self):
+        return self._node.sample_format
+
+    @property
+    def frame_width(self):
+        return self._node.frame_width
+
+    def frame_count(self, ms=None):
+        if ms is not None:
+            return ms * (self.frame_rate / 1000.0)
+        return float(self._node.frame_count)
+
+    @property
+    def duration_seconds(self):
+        return self.frame_rate and self.frame_count() / self.frame_rate or 0.0
+
+    def __len__(self):
+        return round(1000 * (self.frame_count() / self.frame_rate))
+
+    def _parse_position(self, val):
+        if val < 0:
+            val = len(self) - abs(val)
+        val = self.frame_count(ms=len(self)) if val == float("inf") else \
+            self.frame_count(ms=val)
+        return int(val)
+
+    def __getitem__(self, millisecond):
+        if isinstance(millisecond, slice):
+            if millisecond.step:
+                return (
+                    self[i:i + millisecond.step]
+                    for i in range(*millisecond.indices(len(self)))
+                )
+
+            start = millisecond.start if millisecond.start is not None else 0
+            end = millisecond.stop if millisecond.stop is not None \
+                else len(self)
+
+            start = min(start, len(self))
+            end = min(end, len(self))
+        else:
+            start = millisecond
+            end = millisecond + 1
+
+        start = max(self._parse_position(start), 0)
+        frame_count = max(self._parse_position(end) - start, 0)
+
+        node = self._node
+        available = max(min(start + frame_count, node.frame_count) - start, 0)
+        missing_frames = frame_count - available
+        if missing_frames > self.frame_count(ms=2):
+            raise TooManyMissingFrames(
+                "You should never be filling in "
+                "   more than 2 ms with silence here, "
+                "missing frames: %s" % missing_frames)
+
+        if start == 0 and frame_count == node.frame_count:
+            return self
+        if isinstance(node, _Slice) and not missing_frames:
+            return LazySegment(_Slice(node.child, node.start + start, frame_count))
+        return LazySegment(_Slice(node, start, frame_count))
+
+    def __add__(self, arg):
+        if isinstance(arg, (AudioSegment, LazySegment)):
+            return self.append(arg, crossfade=0)
+        else:
+            return self.apply_gain(arg)
+
+    def __radd__(self, rarg):
+        if rarg == 0:
+            return self
+        raise TypeError("Gains must be the second addend after the "
+                        "LazySegment")
+
+    def __sub__(self, arg):
+        if isinstance(arg, (AudioSegment, LazySegment)):
+            raise TypeError("LazySegment objects can't be subtracted from "
+                            "each other")
+        else:
+            return self.apply_gain(-arg)
+
+    def __mul__(self, arg):
+        if isinstance(arg, (AudioSegment, LazySegment)):
+            return self.overlay(arg, position=0, loop=True)
+        elif arg <= 0:
+            return self[:0]
+        else:
+            return LazySegment(_Concat([self._node] * arg))
+
+    def lazy(self):
+        return self
+
+    def _apply_step(self, step):
+        node = self._node
+        if isinstance(node, _Gain):
+            return LazySegment(_Gain(node.child, node.steps + [step]))
+        return LazySegment(_Gain(node, [step]))
+
+    def apply_gain(self, volume_change):
+        volume_change = float(volume_change)
+        return self._apply_step(_GainStep(volume_change, volume_change, 0, 0, 'linear'))
+
+    def fade(self, to_gain=0, from_gain=0, start=None, end=None,
+             duration=None, curve='linear'):
+        """
+        Same as AudioSegment.fade()
+        """
+        if None not in [duration, end, start]:
+            raise TypeError('Only two of the three arguments, "start", '
+                            '"end", and "duration" may be specified')
+
+        if curve not in FADE_CURVES:
+            raise ValueError("curve must be one of {0}".format(", ".join(FADE_CURVES)))
+
+        # no fade == the same audio
+        if to_gain == 0 and from_gain == 0:
+            return self
+
+        fade_start, fade_frames = _fade_position(self, start, end, duration)
+        return self._apply_step(_GainStep(from_gain, to_gain, fade_start, fade_frames, curve))
+
+    def fade_out(self, duration, curve='linear'):
+        return self.fade(to_gain=-120, duration=duration, end=float('inf'),
+                         curve=curve)
+
+    def fade_in(self, duration, curve='linear'):
+        return self.fade(from_gain=-120, duration=duration, start=0,
+                         curve=curve)
+
+    def overlay(self, seg, position=0, loop=False, times=None, gain_during_overlay=None):
+        """
+        Same as AudioSegment.overlay()
+        """
+        if loop:
+            times = -1
+        elif times is None:
+            times = 1
+        elif times == 0:
+            return self
+
+        base, other = _sync(self._node, _node_of(seg))
+
+        # split the same way AudioSegment.overlay() does, since the slices
+        # may be padded
+        base_seg = LazySegment(base)
+        head, tail = base_seg[:position]._node, base_seg[position:]._node
+        base = _Concat([head, tail])
+        position = head.frame_count
+
+        frame_count = tail.frame_count
+        if times > 0:
+            frame_count = min(frame_count, other.frame_count * times)
+        if not other.frame_count:
+            frame_count = 0
+
+        return LazySegment(_Overlay(base, other, position, frame_count, gain_during_overlay))
+
+    def append(self, seg, crossfade=100):
+        """
+        Same as AudioSegment.append()
+        """
+        seg1, seg2 = (LazySegment(node) for node in _sync(self._node, _node_of(seg)))
+
+        if not crossfade:
+            return LazySegment(_Concat([seg1._node, seg2._node]))
+        elif crossfade > len(self):
+            raise ValueError("Crossfade is longer than the original AudioSegment ({}ms > {}ms)".format(
+                crossfade, len(self)
+            ))
+        elif crossfade > len(seg):
+            raise ValueError("Crossfade is longer than the appended AudioSegment ({}ms > {}ms)".format(
+                crossfade, len(seg)
+            ))
+
+        xf = seg1[-crossfade:].fade(to_gain=-120, start=0, end=float('inf'))
+        xf *= seg2[:crossfade].fade(from_gain=-120, start=0, end=float('inf'))
+
+        return LazySegment(_Concat([seg1[:-crossfade]._node, xf._node, seg2[crossfade:]._node]))
+
+    def render(self):
+        """
+        Returns the resulting audio as an AudioSegment
+        """
+        return self._node.to_segment()
+
+    @property
+    def raw_data(self):
+        return self.render().raw_data
+
+    def iter_chunks(self, chunk_ms=1000):
+        """
+        Renders the audio chunk_ms milliseconds at a time, yielding an
+        AudioSegment for each chunk.
+        """
+        frame_count = self._node.frame_count
+        chunk_frames = max(1, int(self.frame_count(ms=chunk_ms)))
+        for start in range(0, frame_count, chunk_frames):
+            yield self._node.to_segment(start, min(start + chunk_frames, frame_count))
+
+    def export(self, out_f=None, format='mp3', chunk_ms=1000, **kwargs):
+        """
+        Renders the audio chunk by chunk and exports it with
+        AudioSegment.export_segments(), which takes the same keyword
+        arguments.
+        """
+        chunks = self.iter_chunks(chunk_ms)
+        if not self._node.frame_count:
+            chunks = [self.render()]
+        return AudioSegment.export_segments(chunks, out_f, format=format, **kwargs)
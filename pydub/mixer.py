@@ -0,0 +1,196 @@
+"""
+Mix many AudioSegments together at once.
+
+AudioSegment.overlay() mixes one segment at a time and copies all of the
+audio each time, a Mixer collects every segment (with its position, gain and
+looping) first and then renders the mix in a single pass, or block by block.
+"""
+from collections import namedtuple
+
+from .audio_segment import AudioSegment
+from .utils import audioop, db_to_float, get_array_type, get_min_max_value
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+
+_Track = namedtuple('_Track', ['data', 'start', 'frame_count', 'total_frames', 'factor'])
+
+
+class Mixer(object):
+    """
+    A timeline of AudioSegments to be mixed together.
+
+    base (optional AudioSegment):
+        The audio the other segments are mixed on to. The mix has the same
+        format and length as base (like overlay() does). Without a base, the
+        format is that of the first segment added and the mix lasts until the
+        end of the last one.
+
+    With numpy the segments are summed at a higher precision and clipped once
+    at the end (float32 mixes aren't clipped), otherwise each segment is added
+    (and clipped) in turn, same as overlay() does.
+    """
+
+    def __init__(self, base=None):
+        self._base = base.view() if base is not None else None
+        self._format = base
+        self._tracks = []
+
+    def add(self, segment, position=0, gain=0, loop=False, times=None):
+        """
+        Adds segment to the mix, and returns the mixer so calls can be chained.
+
+        position (int):
+            Where the segment starts, in milliseconds. Negative positions
+            count from the end of base.
+
+        gain (float):
+            Change in volume of the segment, in dB
+
+        loop (bool):
+            Repeat the segment until the end of the mix
+
+        times (int):
+            Repeat the segment this many times (or until the end of the mix)
+        """
+        if loop:
+            times = -1
+        elif times is None:
+            times = 1
+        elif times == 0:
+            return self
+
+        if self._format is None:
+            self._format = segment
+        fmt = self._format
+        segment = segment.set_channels(fmt.channels).set_frame_rate(fmt.frame_rate)
+        segment = segment.set_sample_width(fmt.sample_width)
+        segment = segment.set_sample_format(fmt.sample_format).view()
+
+        if position < 0:
+            if self._base is None:
+                raise ValueError("Negative positions need a base AudioSegment")
+            position = max(self._base._parse_position(position), 0)
+        else:
+            position = int(fmt.frame_count(ms=position))
+
+        frame_count = int(segment.frame_count())
+        total_frames = frame_count * times if times > 0 else None
+        if not frame_count:
+            return self
+
+        self._tracks.append(_Track(segment._data, position, frame_count,
+                                   total_frames, db_to_float(float(gain))))
+        return self
+
+    def frame_count(self):
+        if self._base is not None:
+            return int(self._base.frame_count())
+
+        frame_count = 0
+        for track in self._tracks:
+            end = track.start + (track.total_frames or track.frame_count)
+            frame_count = max(frame_count, end)
+        return frame_count
+
+    def __len__(self):
+        if self._format is None:
+            return 0
+        return round(1000 * (self.frame_count() / self._format.frame_rate))
+
+    def _spans(self, track, start, end):
+        """
+        Yields (first frame, last frame, frame of the track) for each piece of
+        the track which is mixed into frames start up to end.
+        """
+        if track.total_frames is not None:
+            end = min(end, track.start + track.total_frames)
+        pos = max(start, track.start)
+        while pos < end:
+            offset = (pos - track.start) % track.frame_count
+            stop = min(end, pos + track.frame_count - offset)
+            yield pos, stop, offset
+            pos = stop
+
+    def _render(self, start, end):
+        fmt = self._format
+        sample_width, channels = fmt.sample_width, fmt.channels
+        frame_width = fmt.frame_width
+
+        if self._base is not None:
+            data = self._base._data[start * frame_width:end * frame_width]
+        else:
+            data = b'\0' * ((end - start) * frame_width)
+
+        if fmt.sample_format == 'float32':
+            mix = np.frombuffer(data, dtype=np.float32).astype(np.float64)
+            for track in self._tracks:
+                for first, last, offset in self._spans(track, start, end):
+                    samples = np.frombuffer(
+                        track.data[offset * frame_width:(offset + last - first) * frame_width],
+                        dtype=np.float32)
+                    mix[(first - start) * channels:(last - start) * channels] += samples * track.factor
+            return mix.astype(np.float32).tobytes()
+
+        if np is not None and sample_width != 3:
+            array_type = get_array_type(sample_width * 8)
+            mix = np.frombuffer(data, dtype=array_type).astype(np.int64)
+            for track in self._tracks:
+                for first, last, offset in self._spans(track, start, end):
+                    samples = np.frombuffer(
+                        track.data[offset * frame_width:(offset + last - first) * frame_width],
+                        dtype=array_type)
+                    if track.factor != 1.0:
+                        samples = np.floor(samples * track.factor).astype(np.int64)
+                    mix[(first - start) * channels:(last - start) * channels] += samples
+
+            minval, maxval = get_min_max_value(sample_width * 8)
+            np.clip(mix, minval, maxval, out=mix)
+            return mix.astype(array_type).tobytes()
+
+        mix = bytearray(data)
+        for track in self._tracks:
+            for first, last, offset in self._spans(track, start, end):
+                piece = track.data[offset * frame_width:(offset + last - first) * frame_width]
+                if track.factor != 1.0:
+                    piece = audioop.mul(piece, sample_width, track.factor)
+                pos, stop = (first - start) * frame_width, (last - start) * frame_width
+                mix[pos:stop] = audioop.add(mix[pos:stop], piece, sample_width)
+        return bytes(mix)
+
+    def _segment(self, start, end):
+        return self._format._spawn(self._render(start, end))
+
+    def render(self):
+        """
+        Returns the mix as an AudioSegment
+        """
+        if self._format is None:
+            return AudioSegment.empty()
+        return self._segment(0, self.frame_count())
+
+    def iter_chunks(self, chunk_ms=1000):
+        """
+        Renders the mix chunk_ms milliseconds at a time, yielding an
+        AudioSegment for each chunk.
+        """
+        if self._format is None:
+            return
+        frame_count = self.frame_count()
+        chunk_frames = max(1, int(self._format.frame_count(ms=chunk_ms)))
+        for start in range(0, frame_count, chunk_frames):
+            yield self._segment(start, min(start + chunk_frames, frame_count))
+
+    def export(self, out_f=None, format='mp3', chunk_ms=1000, **kwargs):
+        """
+        Renders the mix chunk by chunk and exports it with
+        AudioSegment.export_segments(), which takes the same keyword
+        arguments.
+        """
+        chunks = self.iter_chunks(chunk_ms)
+        if not self.frame_count():
+            chunks = [self.render()]
+        return AudioSegment.export_segments(chunks, out_f, format=format, **kwargs)
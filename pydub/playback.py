@@ -20,7 +20,11 @@ def _play_with_pyaudio(seg):
     import pyaudio
 
     p = pyaudio.PyAudio()
-    stream = p.open(format=p.get_format_from_width(seg.sample_width),
+    if seg.sample_format == 'float32':
+        sample_format = pyaudio.paFloat32
+    else:
+        sample_format = p.get_format_from_width(seg.sample_width)
+    stream = p.open(format=sample_format,
                     channels=seg.channels,
                     rate=seg.frame_rate,
                     output=True)
@@ -30,7 +34,7 @@ def _play_with_pyaudio(seg):
     try:
         # break audio into half-second chunks (to allows keyboard interrupts)
         for chunk in make_chunks(seg, 500):
-            stream.write(chunk._data)
+            stream.write(chunk.raw_data)
     finally:
         stream.stop_stream()
         stream.close()
@@ -40,6 +44,8 @@ def _play_with_pyaudio(seg):
 
 def _play_with_simpleaudio(seg):
     import simpleaudio
+    # simpleaudio only plays integer samples
+    seg = seg.set_sample_format('int')
     return simpleaudio.play_buffer(
         seg.raw_data,
         num_channels=seg.channels,
@@ -0,0 +1,320 @@
+"""
+Convert many files with fewer converter processes.
+
+Starting ffmpeg/avconv takes most of the time it takes to convert a short
+file. A ConverterPool converts files in batches instead, each converter
+process has one input and one output for every file of its batch, so the
+start up is shared by the whole batch.
+"""
+import multiprocessing
+import os
+import shutil
+import subprocess
+import time
+from tempfile import mkdtemp
+
+from .audio_segment import (
+    AUDIO_FILE_EXT_ALIASES,
+    PCM_FORMATS,
+    AudioSegment,
+    DecodeResult,
+    ExportResult,
+    _decode_job,
+    _export_job,
+    _fd_or_path_or_tempfile,
+    _is_format,
+    _map_in_threads,
+    _seek_options,
+)
+from .logging_utils import log_conversion, log_subprocess_output
+from .utils import fsdecode
+
+# keyword arguments of from_file() and export() which batches can handle
+_BATCH_DECODE_ARGS = ('format', 'codec', 'start_second', 'duration', 'read_ahead_limit', 'probe', 'keep_24bit',
+                      'fast_seek')
+_BATCH_EXPORT_ARGS = ('format', 'codec', 'bitrate', 'parameters', 'tags', 'id3v2_version')
+
+
+def _batches(items, batch_size):
+    batch = []
+    for item in items:
+        batch.append(item)
+        if len(batch) == batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def _run(command):
+    log_conversion(command)
+    with open(os.devnull, 'rb') as devnull:
+        p = subprocess.Popen(command, stdin=devnull, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    p_out, p_err = p.communicate()
+    return p.returncode, p_out, p_err
+
+
+class ConverterPool(object):
+    """
+    Decodes and encodes many files, batch_size files per converter process.
+
+    size (int):
+        How many converter processes run at once (default: the number of CPUs)
+
+    batch_size (int):
+        The most files converted by each converter process.
+
+    Only files given by path (which aren't wav or raw) are decoded in
+    batches, the others are loaded with AudioSegment.from_file() as usual.
+    Batches are only used with probe=False (or a codec), probing every file
+    would start an ffprobe process for each of them anyway.
+    When a batch fails, the converter is checked again (see check()) and the
+    files of the batch are converted one at a time, so a file which can't be
+    converted only fails itself.
+    """
+
+    def __init__(self, size=None, batch_size=16):
+        if size is None:
+            size = multiprocessing.cpu_count()
+        self.size = max(size, 1)
+        self.batch_size = max(batch_size, 1)
+        self.healthy = None
+
+    def check(self):
+        """
+        Returns True if the converter (AudioSegment.converter) can be run.
+        Batches are only used while it can.
+        """
+        try:
+            returncode, _, _ = _run([AudioSegment.converter, '-version'])
+        except OSError:
+            returncode = None
+        self.healthy = returncode == 0
+        return self.healthy
+
+    def _map(self, fn, items):
+        for results in _map_in_threads(fn, _batches(items, self.batch_size), self.size, 2 * self.size):
+            for result in results:
+                yield result
+
+    def _use_batches(self, count):
+        if count < 2:
+            return False
+        if self.healthy is None:
+            self.check()
+        return self.healthy
+
+    def from_files(self, files, **kwargs):
+        """
+        Same as AudioSegment.from_files(), yields a DecodeResult(source,
+        segment, error) for each file (in the same order as files).
+        """
+        batch_kwargs = all(key in _BATCH_DECODE_ARGS for key in kwargs) and (
+            not kwargs.get('probe', True) or bool(kwargs.get('codec')))
+
+        def decode(batch):
+            results = [None] * len(batch)
+            batched = []
+            for i, source in enumerate(batch):
+                filename = self._batch_filename(source, kwargs) if batch_kwargs else None
+                if filename is None:
+                    results[i] = _decode_job(AudioSegment, source, kwargs)
+                else:
+                    batched.append((i, source, filename))
+
+            decoded = None
+            if self._use_batches(len(batched)):
+                decoded = self._decode_batch([filename for _, _, filename in batched], kwargs)
+                if decoded is None:
+                    self.check()
+            for n, (i, source, _) in enumerate(batched):
+                if decoded is None:
+                    results[i] = _decode_job(AudioSegment, source, kwargs)
+                else:
+                    results[i] = DecodeResult(source, decoded[n][0], decoded[n][1])
+            return results
+
+        return self._map(decode, files)
+
+    @staticmethod
+    def _batch_filename(source, kwargs):
+        try:
+            filename = fsdecode(source)
+        except TypeError:
+            # file objects are piped to the converter
+            return None
+
+        format = kwargs.get('format')
+        if format:
+            format = format.lower()
+            format = AUDIO_FILE_EXT_ALIASES.get(format, format)
+        if any(_is_format(f, format, filename) for f in ('wav', 'raw', 'pcm')):
+            # these are read without a converter
+            return None
+        return filename
+
+    def _decode_batch(self, filenames, kwargs):
+        """
+        Decodes filenames with a single converter process, returning a
+        (segment, error) tuple for each of them, or None if the converter
+        failed.
+        """
+        format = kwargs.get('format')
+        if format:
+            format = format.lower()
+            format = AUDIO_FILE_EXT_ALIASES.get(format, format)
+        codec = kwargs.get('codec')
+        start_second = kwargs.get('start_second')
+        duration = kwargs.get('duration')
+        # only called with probe=False (or a codec, which picks the output
+        # codec), so the files aren't probed
+        probe = bool(codec)
+        keep_24bit = kwargs.get('keep_24bit', False)
+        input_seek, output_seek = _seek_options(start_second, kwargs.get('fast_seek', False))
+
+        command = [AudioSegment.converter, '-y']
+        for filename in filenames:
+            if format:
+                command += ["-f", format]
+            if codec:
+                command += ["-acodec", codec]
+            command += input_seek + ["-i", filename]
+
+        tmpdir = mkdtemp()
+        try:
+            outputs = []
+            for i, filename in enumerate(filenames):
+                command += ["-map", "%d:a:0" % i]
+                acodec = AudioSegment._decoded_codec(filename, codec, probe=probe)
+                if acodec:
+                    command += ["-acodec", acodec]
+                command += ["-vn", "-f", "wav"] + output_seek
+                if duration is not None:
+                    command += ["-t", str(duration)]
+
+                outputs.append(os.path.join(tmpdir, '%d.wav' % i))
+                command.append(outputs[-1])
+
+            returncode, _, p_err = _run(command)
+            if returncode != 0:
+                return None
+
+            results = []
+            for i, output in enumerate(outputs):
+                try:
+                    with open(output, 'rb') as f:
+                        wav = f.read()
+                    seg = AudioSegment._from_decoder_output(0, wav, p_err, probe, keep_24bit, start_second,
+                                                            duration, input_index=i)
+                    results.append((seg, None))
+                except Exception as e:
+                    results.append((None, e))
+            return results
+        finally:
+            shutil.rmtree(tmpdir, ignore_errors=True)
+
+    def export_many(self, jobs):
+        """
+        Same as AudioSegment.export_many(), returns an ExportResult(out_f,
+        error, seconds) for each job (in the same order as jobs). The seconds
+        of jobs which were exported in a batch is the time the whole batch
+        took.
+        """
+        def export(batch):
+            results = [None] * len(batch)
+            batched = []
+            for i, job in enumerate(batch):
+                if self._can_batch_export(job):
+                    batched.append(i)
+                else:
+                    results[i] = _export_job(job)
+
+            exported = None
+            if self._use_batches(len(batched)):
+                exported = self._encode_batch([batch[i] for i in batched])
+                if exported is None:
+                    self.check()
+            for n, i in enumerate(batched):
+                results[i] = _export_job(batch[i]) if exported is None else exported[n]
+            return results
+
+        return list(self._map(export, jobs))
+
+    @staticmethod
+    def _can_batch_export(job):
+        segment = job[0]
+        kwargs = job[2] if len(job) > 2 else {}
+        if not isinstance(segment, AudioSegment) or any(key not in _BATCH_EXPORT_ARGS for key in kwargs):
+            return False
+
+        format = kwargs.get('format', 'mp3')
+        # raw and plain wav exports don't need a converter
+        return format != "raw" and not (
+            format == "wav" and kwargs.get('codec') is None and kwargs.get('parameters') is None)
+
+    def _encode_batch(self, jobs):
+        """
+        Encodes the segments of jobs with a single converter process,
+        returning an ExportResult for each of them, or None if the converter
+        failed.
+        """
+        start = time.time()
+        try:
+            options = []
+            for job in jobs:
+                kwargs = dict(job[2]) if len(job) > 2 else {}
+                format = kwargs.pop('format', 'mp3')
+                options.append(AudioSegment._encode_options(format, **kwargs))
+        except Exception:
+            # the error is raised again when the job is exported on its own
+            return None
+
+        tmpdir = mkdtemp()
+        try:
+            command = [AudioSegment.converter, '-y']
+            for i, job in enumerate(jobs):
+                # float32 samples are exported as 32-bit ints
+                seg = job[0].set_sample_format('int')
+                pcm = os.path.join(tmpdir, '%d.pcm' % i)
+                with open(pcm, 'wb') as f:
+                    f.write(seg._data)
+                command += [
+                    "-f", PCM_FORMATS[seg.sample_width],
+                    "-ar", str(seg.frame_rate),
+                    "-ac", str(seg.channels),
+                    "-i", pcm,
+                ]
+
+            outputs = []
+            for i, job_options in enumerate(options):
+                outputs.append(os.path.join(tmpdir, '%d.out' % i))
+                command += ["-map", "%d:a" % i] + job_options + [outputs[-1]]
+
+            returncode, p_out, p_err = _run(command)
+            log_subprocess_output(p_out)
+            log_subprocess_output(p_err)
+            if returncode != 0:
+                return None
+
+            seconds = time.time() - start
+            results = []
+            for job, output in zip(jobs, outputs):
+                out_f = job[1]
+                try:
+                    exported, _ = _fd_or_path_or_tempfile(out_f, 'wb+')
+                    exported.seek(0)
+                    with open(output, 'rb') as f:
+                        exported.write(f.read())
+                    exported.seek(0)
+                except Exception as e:
+                    results.append(ExportResult(out_f, e, seconds))
+                    continue
+
+                if out_f is None:
+                    out_f = exported
+                elif exported is not out_f:
+                    exported.close()
+                results.append(ExportResult(out_f, None, seconds))
+            return results
+        finally:
+            shutil.rmtree(tmpdir, ignore_errors=True)
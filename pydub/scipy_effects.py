@@ -9,8 +9,278 @@ will be used when calling audio_segment.high_pass_filter() and
 audio_segment.high_pass_filter() instead of the slower, less powerful versions
 provided by pydub.effects.
 """
+import threading
+from collections import OrderedDict, namedtuple
+from math import cos, pi, sin, sqrt
+
+import numpy as np
 from scipy.signal import butter, sosfilt
-from .utils import (register_pydub_effect,stereo_to_ms,ms_to_stereo)
+from .utils import (register_pydub_effect,get_min_max_value)
+
+# one band of a ParametricEQ. mode is "peak", "low_shelf" or "high_shelf",
+# bandwidth (in Hz) is only used by "peak" bands
+EQBand = namedtuple('EQBand', ['focus_freq', 'gain_dB', 'mode', 'bandwidth'])
+EQBand.__new__.__defaults__ = ("peak", 100)
+
+EQ_MODES = ("peak", "low_shelf", "high_shelf")
+EQ_CHANNEL_MODES = ("L+R", "M+S", "L", "R", "M", "S")
+
+# how many butterworth filter designs are kept (see _butter_sos())
+BUTTER_CACHE_SIZE = 256
+_butter_cache = OrderedDict()
+_butter_cache_lock = threading.Lock()
+_butter_cache_stats = {'hits': 0, 'misses': 0}
+
+# the statistics of butter_cache_info(), like functools.lru_cache's
+ButterCacheInfo = namedtuple('ButterCacheInfo', ['hits', 'misses', 'maxsize', 'currsize'])
+
+
+def _butter_sos(order, freqs, btype):
+    """
+    butter(order, freqs, btype=btype, output='sos') for normalized freqs,
+    the BUTTER_CACHE_SIZE most recently used designs are kept. Every call
+    returns a new copy.
+    """
+    try:
+        key = (order, tuple(freqs), btype)
+    except TypeError:
+        key = (order, freqs, btype)
+
+    with _butter_cache_lock:
+        sos = _butter_cache.get(key)
+        if sos is not None:
+            _butter_cache_stats['hits'] += 1
+            # most recently used last
+            del _butter_cache[key]
+            _butter_cache[key] = sos
+            return sos.copy()
+        _butter_cache_stats['misses'] += 1
+
+    sos = butter(order, freqs, btype=btype, output='sos')
+    with _butter_cache_lock:
+        _butter_cache[key] = sos.copy()
+        while len(_butter_cache) > BUTTER_CACHE_SIZE:
+            _butter_cache.popitem(last=False)
+    return sos
+
+
+def butter_cache_info():
+    """
+    Returns the hits, misses, maximum and current size of the cache of
+    butterworth filter designs as a ButterCacheInfo
+    """
+    with _butter_cache_lock:
+        return ButterCacheInfo(_butter_cache_stats['hits'], _butter_cache_stats['misses'], BUTTER_CACHE_SIZE,
+                               len(_butter_cache))
+
+
+def clear_butter_cache():
+    """
+    Empties the cache of butterworth filter designs and resets its statistics
+    """
+    with _butter_cache_lock:
+        _butter_cache.clear()
+        _butter_cache_stats['hits'] = _butter_cache_stats['misses'] = 0
+
+
+class _SOSFilter(object):
+    """
+    A cascade of second order sections which keeps its state from one call
+    to the next, so a long recording can be filtered in chunks (see
+    AudioSegment.iter_file()) with exactly the same result as filtering all
+    of it at once. Subclasses design the sections in _design().
+    """
+
+    def __init__(self):
+        # second order sections for each frame rate
+        self._sos = {}
+        self.reset()
+
+    def _design(self, frame_rate):
+        raise NotImplementedError
+
+    def sos(self, frame_rate):
+        """
+        Returns the filter's second order sections for audio at frame_rate
+        """
+        sos = self._sos.get(frame_rate)
+        if sos is None:
+            sos = self._sos[frame_rate] = self._design(frame_rate)
+        return sos
+
+    def reset(self):
+        """
+        Forgets the audio filtered so far, the next segment is filtered as
+        the start of a new recording.
+        """
+        self._zi = None
+        self._format = None
+
+    def _filter(self, sos, samples):
+        """
+        Filters the columns of samples, a (frames, columns) array
+        """
+        if self._zi is None:
+            self._zi = np.zeros((sos.shape[0], 2, samples.shape[1]))
+        y, self._zi = sosfilt(sos, samples, axis=0, zi=self._zi)
+        return y
+
+    def _filter_frames(self, sos, frames):
+        return self._filter(sos, frames)
+
+    def __call__(self, seg):
+        """
+        Filters seg, continuing from the end of the previous segment (which
+        must have the same channels and frame rate).
+        """
+        if self._format is None:
+            self._format = (seg.channels, seg.frame_rate)
+        elif self._format != (seg.channels, seg.frame_rate):
+            raise ValueError("Segments must have the same channels and frame rate as the ones filtered "
+                             "before them, call reset() to start over")
+
+        sos = self.sos(seg.frame_rate)
+        frames = np.frombuffer(seg.get_array_of_samples(), dtype=seg.array_type)
+        frames = frames.reshape(-1, seg.channels).astype(np.float64)
+        y = self._filter_frames(sos, frames)
+
+        if seg.sample_format != 'float32':
+            minval, maxval = get_min_max_value(seg.sample_width * 8)
+            np.clip(y, minval, maxval, out=y)
+        return seg._spawn(y.astype(seg.array_type).reshape(-1))
+
+
+class ButterworthFilter(_SOSFilter):
+    """
+    A butterworth filter of every channel, which keeps its state from one
+    call to the next.
+
+    Args:
+        freq: The cutoff frequency for highpass and lowpass filters. For
+            band filters, a list of [low_cutoff, high_cutoff]
+        type: "lowpass", "highpass", or "band"
+        order: nth order butterworth filter (see _mk_butter_filter())
+
+    Example:
+        lowpass = ButterworthFilter(3000, "lowpass")
+        chunks = AudioSegment.iter_file("long.mp3", chunk_ms=10000)
+        AudioSegment.export_segments((lowpass(chunk) for chunk in chunks), "out.mp3")
+    """
+
+    def __init__(self, freq, type="lowpass", order=5):
+        super(ButterworthFilter, self).__init__()
+        self.freq = freq
+        self.type = type
+        self.order = order
+
+    def _design(self, frame_rate):
+        nyq = 0.5 * frame_rate
+        try:
+            freqs = [f / nyq for f in self.freq]
+        except TypeError:
+            freqs = self.freq / nyq
+        return _butter_sos(self.order, freqs, self.type)
+
+
+def _biquad(band, frame_rate):
+    """
+    Returns the second order section (b0, b1, b2, 1, a1, a2) of an EQBand,
+    using the peaking and shelving filters of Robert Bristow-Johnson's
+    "Cookbook formulae for audio EQ biquad filter coefficients".
+    """
+    if not 0 < band.focus_freq < frame_rate / 2.0:
+        raise ValueError("EQ band frequencies must be between 0 and half the frame rate ({0} Hz)".format(
+            frame_rate / 2.0))
+
+    A = 10 ** (band.gain_dB / 40.0)
+    w0 = 2 * pi * band.focus_freq / frame_rate
+    cos_w0 = cos(w0)
+
+    if band.mode == "peak":
+        if band.bandwidth <= 0:
+            raise ValueError("EQ band bandwidth must be positive")
+        alpha = sin(w0) * band.bandwidth / (2.0 * band.focus_freq)
+        b = [1 + alpha * A, -2 * cos_w0, 1 - alpha * A]
+        a = [1 + alpha / A, -2 * cos_w0, 1 - alpha / A]
+    else:
+        # shelf slope of 1, the steepest without overshoot
+        shelf = 2 * sqrt(A) * sin(w0) / sqrt(2)
+        if band.mode == "low_shelf":
+            b = [A * ((A + 1) - (A - 1) * cos_w0 + shelf),
+                 2 * A * ((A - 1) - (A + 1) * cos_w0),
+                 A * ((A + 1) - (A - 1) * cos_w0 - shelf)]
+            a = [(A + 1) + (A - 1) * cos_w0 + shelf,
+                 -2 * ((A - 1) + (A + 1) * cos_w0),
+                 (A + 1) + (A - 1) * cos_w0 - shelf]
+        else:
+            b = [A * ((A + 1) + (A - 1) * cos_w0 + shelf),
+                 -2 * A * ((A - 1) + (A + 1) * cos_w0),
+                 A * ((A + 1) + (A - 1) * cos_w0 - shelf)]
+            a = [(A + 1) - (A - 1) * cos_w0 + shelf,
+                 2 * ((A - 1) - (A + 1) * cos_w0),
+                 (A + 1) - (A - 1) * cos_w0 - shelf]
+
+    return [x / a[0] for x in b + a]
+
+
+class ParametricEQ(_SOSFilter):
+    """
+    A parametric equalizer, all of its bands are applied in a single pass
+    (a cascade of one biquad filter per band). Like ButterworthFilter it
+    keeps its state from one call to the next.
+
+    Args:
+        bands: EQBand(focus_freq, gain_dB, mode="peak", bandwidth=100)s, or
+            tuples/dicts of their arguments
+        channel_mode: Which channels of stereo segments are equalized (see
+            eq()), mono segments are always equalized.
+
+    Example:
+        loudness = ParametricEQ([EQBand(100, 6, "low_shelf"), EQBand(3000, -4, "peak", 2000)])
+        seg = loudness(seg)
+    """
+
+    def __init__(self, bands, channel_mode="L+R"):
+        super(ParametricEQ, self).__init__()
+        if channel_mode not in EQ_CHANNEL_MODES:
+            raise ValueError("Incorrect Channel Mode Selection")
+
+        self.bands = []
+        for band in bands:
+            if isinstance(band, dict):
+                band = EQBand(**band)
+            elif not isinstance(band, EQBand):
+                band = EQBand(*band)
+            if band.mode not in EQ_MODES:
+                raise ValueError("Incorrect Mode Selection")
+            self.bands.append(band)
+        self.channel_mode = channel_mode
+
+    def _design(self, frame_rate):
+        if not self.bands:
+            return np.array([[1.0, 0, 0, 1.0, 0, 0]])
+        return np.array([_biquad(band, frame_rate) for band in self.bands])
+
+    def _filter_frames(self, sos, frames):
+        if frames.shape[1] == 1 or self.channel_mode == "L+R":
+            return self._filter(sos, frames)
+        if frames.shape[1] != 2:
+            raise ValueError("Channel mode {0} requires a stereo segment".format(self.channel_mode))
+
+        mid_side = self.channel_mode in ("M+S", "M", "S")
+        if mid_side:
+            frames = np.column_stack([frames.sum(axis=1), frames[:, 0] - frames[:, 1]]) / 2
+
+        if self.channel_mode in ("L", "M"):
+            frames[:, :1] = self._filter(sos, frames[:, :1])
+        elif self.channel_mode in ("R", "S"):
+            frames[:, 1:] = self._filter(sos, frames[:, 1:])
+        else:
+            frames = self._filter(sos, frames)
+
+        if mid_side:
+            frames = np.column_stack([frames.sum(axis=1), frames[:, 0] - frames[:, 1]])
+        return frames
 
 
 def _mk_butter_filter(freq, type, order):
@@ -31,37 +301,41 @@ def _mk_butter_filter(freq, type, order):
     """
     def filter_fn(seg):
         assert seg.channels == 1
-
-        nyq = 0.5 * seg.frame_rate
-        try:
-            freqs = [f / nyq for f in freq]
-        except TypeError:
-            freqs = freq / nyq
-
-        sos = butter(order, freqs, btype=type, output='sos')
-        y = sosfilt(sos, seg.get_array_of_samples())
-
-        return seg._spawn(y.astype(seg.array_type))
+        return ButterworthFilter(freq, type, order)(seg)
 
     return filter_fn
 
 
 @register_pydub_effect
-def band_pass_filter(seg, low_cutoff_freq, high_cutoff_freq, order=5):
+def band_pass_filter(seg, low_cutoff_freq, high_cutoff_freq, order=5, max_workers=1):
     filter_fn = _mk_butter_filter([low_cutoff_freq, high_cutoff_freq], 'band', order=order)
-    return seg.apply_mono_filter_to_each_channel(filter_fn)
+    return seg.apply_mono_filter_to_each_channel(filter_fn, max_workers)
 
 
 @register_pydub_effect
-def high_pass_filter(seg, cutoff_freq, order=5):
+def high_pass_filter(seg, cutoff_freq, order=5, max_workers=1):
     filter_fn = _mk_butter_filter(cutoff_freq, 'highpass', order=order)
-    return seg.apply_mono_filter_to_each_channel(filter_fn)
+    return seg.apply_mono_filter_to_each_channel(filter_fn, max_workers)
 
 
 @register_pydub_effect
-def low_pass_filter(seg, cutoff_freq, order=5):
+def low_pass_filter(seg, cutoff_freq, order=5, max_workers=1):
     filter_fn = _mk_butter_filter(cutoff_freq, 'lowpass', order=order)
-    return seg.apply_mono_filter_to_each_channel(filter_fn)
+    return seg.apply_mono_filter_to_each_channel(filter_fn, max_workers)
+
+
+@register_pydub_effect
+def parametric_eq(seg, bands, channel_mode="L+R"):
+    """
+    Args:
+        bands - EQBand(focus_freq, gain_dB, mode="peak", bandwidth=100)s (or
+            tuples/dicts of their arguments), see ParametricEQ
+        channel_mode - Select Channels to be affected by the filter (see eq())
+
+    Returns:
+        Equalized/Filtered AudioSegment
+    """
+    return ParametricEQ(bands, channel_mode)(seg)
 
 
 @register_pydub_effect
@@ -71,49 +345,13 @@ def _eq(seg, focus_freq, bandwidth=100, mode="peak", gain_dB=0, order=2):
         focus_freq - middle frequency or known frequency of band (in Hz)
         bandwidth - range of the equalizer band
         mode - Mode of Equalization(Peak/Notch(Bell Curve),High Shelf, Low Shelf)
-        order - Rolloff factor(1 - 6dB/Octave 2 - 12dB/Octave)
-    
+        order - Unused, every band is a second order (biquad) filter
+
     Returns:
         Equalized/Filtered AudioSegment
     """
-    filt_mode = ["peak", "low_shelf", "high_shelf"]
-    if mode not in filt_mode:
-        raise ValueError("Incorrect Mode Selection")
-        
-    if gain_dB >= 0:
-        if mode == "peak":
-            sec = band_pass_filter(seg, focus_freq - bandwidth/2, focus_freq + bandwidth/2, order = order)
-            seg = seg.overlay(sec - (3 - gain_dB))
-            return seg
-        
-        if mode == "low_shelf":
-            sec = low_pass_filter(seg, focus_freq, order=order)
-            seg = seg.overlay(sec - (3 - gain_dB))
-            return seg
-        
-        if mode == "high_shelf":
-            sec = high_pass_filter(seg, focus_freq, order=order)
-            seg = seg.overlay(sec - (3 - gain_dB))
-            return seg
-        
-    if gain_dB < 0:
-        if mode == "peak":
-            sec = high_pass_filter(seg, focus_freq - bandwidth/2, order=order)
-            seg = seg.overlay(sec - (3 + gain_dB)) + gain_dB
-            sec = low_pass_filter(seg, focus_freq + bandwidth/2, order=order)
-            seg = seg.overlay(sec - (3 + gain_dB)) + gain_dB
-            return seg
-        
-        if mode == "low_shelf":
-            sec = high_pass_filter(seg, focus_freq, order=order)
-            seg = seg.overlay(sec - (3 + gain_dB)) + gain_dB
-            return seg
-        
-        if mode=="high_shelf":
-            sec=low_pass_filter(seg, focus_freq, order=order)
-            seg=seg.overlay(sec - (3 + gain_dB)) +gain_dB
-            return seg
-        
+    return parametric_eq(seg, [EQBand(focus_freq, gain_dB, mode, bandwidth)])
+
 
 @register_pydub_effect
 def eq(seg, focus_freq, bandwidth=100, channel_mode="L+R", filter_mode="peak", gain_dB=0, order=2):
@@ -130,46 +368,9 @@ def eq(seg, focus_freq, bandwidth=100, channel_mode="L+R", filter_mode="peak", g
             S - Only Side Channel is Filtered
             Mono Audio Segments are completely filtered.
         filter_mode - Mode of Equalization(Peak/Notch(Bell Curve),High Shelf, Low Shelf)
-        order - Rolloff factor(1 - 6dB/Octave 2 - 12dB/Octave)
-    
+        order - Unused, every band is a second order (biquad) filter
+
     Returns:
         Equalized/Filtered AudioSegment
     """
-    channel_modes = ["L+R", "M+S", "L", "R", "M", "S"]
-    if channel_mode not in channel_modes:
-        raise ValueError("Incorrect Channel Mode Selection")
-        
-    if seg.channels == 1:
-        return _eq(seg, focus_freq, bandwidth, filter_mode, gain_dB, order)
-        
-    if channel_mode == "L+R":
-        return _eq(seg, focus_freq, bandwidth, filter_mode, gain_dB, order)
-        
-    if channel_mode == "L":
-        seg = seg.split_to_mono()
-        seg = [_eq(seg[0], focus_freq, bandwidth, filter_mode, gain_dB, order), seg[1]]
-        return AudioSegment.from_mono_audio_segements(seg[0], seg[1])
-        
-    if channel_mode == "R":
-        seg = seg.split_to_mono()
-        seg = [seg[0], _eq(seg[1], focus_freq, bandwidth, filter_mode, gain_dB, order)]
-        return AudioSegment.from_mono_audio_segements(seg[0], seg[1])
-        
-    if channel_mode == "M+S":
-        seg = stereo_to_ms(seg)
-        seg = _eq(seg, focus_freq, bandwidth, filter_mode, gain_dB, order)
-        return ms_to_stereo(seg)
-        
-    if channel_mode == "M":
-        seg = stereo_to_ms(seg).split_to_mono()
-        seg = [_eq(seg[0], focus_freq, bandwidth, filter_mode, gain_dB, order), seg[1]]
-        seg = AudioSegment.from_mono_audio_segements(seg[0], seg[1])
-        return ms_to_stereo(seg)
-        
-    if channel_mode == "S":
-        seg = stereo_to_ms(seg).split_to_mono()
-        seg = [seg[0], _eq(seg[1], focus_freq, bandwidth, filter_mode, gain_dB, order)]
-        seg = AudioSegment.from_mono_audio_segements(seg[0], seg[1])
-        return ms_to_stereo(seg)
-
-
+    return parametric_eq(seg, [EQBand(focus_freq, gain_dB, filter_mode, bandwidth)], channel_mode)
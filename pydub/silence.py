@@ -2,9 +2,100 @@
 Various functions for finding/manipulating silence in AudioSegments
 """
 import itertools
+import math
+import operator
 
 from .utils import db_to_float
 
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+
+def _ms_energy_prefix(audio_segment):
+    """
+    Returns a sequence where item i is the sum of the squares of every sample
+    in audio_segment[:i] (using the same millisecond to frame rounding as
+    slicing does), along with the frame index of every millisecond boundary.
+
+    Together these give the rms of any slice of whole milliseconds in
+    constant time, see _slice_rms().
+    """
+    seg_len = len(audio_segment)
+    channels = audio_segment.channels
+    frame_count = int(audio_segment.frame_count())
+    frames_per_ms = audio_segment.frame_rate / 1000.0
+
+    if np is not None and audio_segment.sample_width != 3:
+        boundaries = (np.arange(seg_len + 1) * frames_per_ms).astype(np.int64)
+        # slices past the end of the audio are padded with silence
+        ends = np.minimum(boundaries, frame_count)
+
+        # read the samples in place rather than copying them to an array
+        frames = np.frombuffer(audio_segment._data,
+                               dtype=audio_segment.array_type)
+        frames = frames[:frame_count * channels].reshape(-1, channels)
+
+        # use exact integer sums unless they could overflow
+        max_square = (audio_segment.max_possible_amplitude ** 2) * channels
+        if audio_segment.sample_format == 'float32':
+            sum_type = np.float64
+        elif max_square * (frame_count + 1) < 2 ** 63:
+            sum_type = np.int64
+        else:
+            sum_type = np.float64
+
+        prefix = np.zeros(seg_len + 1, dtype=sum_type)
+        total = 0
+        block_ms = 10000
+        for block_start in range(0, seg_len, block_ms):
+            block_end = min(block_start + block_ms, seg_len)
+            first_frame = ends[block_start]
+            squares = frames[first_frame:ends[block_end]].astype(sum_type)
+            squares *= squares
+            frame_energy = np.zeros(len(squares) + 1, dtype=sum_type)
+            np.cumsum(squares.sum(axis=1), out=frame_energy[1:])
+
+            block_ends = ends[block_start + 1:block_end + 1] - first_frame
+            prefix[block_start + 1:block_end + 1] = frame_energy[block_ends] + total
+            total += frame_energy[-1]
+
+        return prefix.tolist(), boundaries.tolist()
+
+    samples = audio_segment.get_array_of_samples()
+    boundaries = [int(ms * frames_per_ms) for ms in range(seg_len + 1)]
+    prefix = [0] * (seg_len + 1)
+    total = 0
+    for ms in range(seg_len):
+        start = min(boundaries[ms], frame_count) * channels
+        end = min(boundaries[ms + 1], frame_count) * channels
+        chunk = samples[start:end]
+        total += sum(map(operator.mul, chunk, chunk))
+        prefix[ms + 1] = total
+
+    return prefix, boundaries
+
+
+def _slice_rms(audio_segment):
+    """
+    Returns a function rms(start, end) which is equal to
+    audio_segment[start:end].rms for whole milliseconds 0 <= start <= end <=
+    len(audio_segment), but takes constant time.
+    """
+    prefix, boundaries = _ms_energy_prefix(audio_segment)
+    channels = audio_segment.channels
+    # same as audioop.rms(), which rounds down (float32 samples aren't rounded)
+    to_rms = float if audio_segment.sample_format == 'float32' else int
+
+    def rms(start, end):
+        sample_count = (boundaries[end] - boundaries[start]) * channels
+        if not sample_count:
+            return 0
+        return to_rms(math.sqrt(max(prefix[end] - prefix[start], 0) / float(sample_count)))
+
+    return rms
+
 
 def detect_silence(audio_segment, min_silence_len=1000, silence_thresh=-16, seek_step=1):
     """
@@ -38,9 +129,11 @@ def detect_silence(audio_segment, min_silence_len=1000, silence_thresh=-16, seek
     if last_slice_start % seek_step:
         slice_starts = itertools.chain(slice_starts, [last_slice_start])
 
+    # the energy of the audio is only computed once, so the rms of each slice
+    # takes constant time no matter how long min_silence_len is
+    slice_rms = _slice_rms(audio_segment)
     for i in slice_starts:
-        audio_slice = audio_segment[i:i + min_silence_len]
-        if audio_slice.rms <= silence_thresh:
+        if slice_rms(i, i + min_silence_len) <= silence_thresh:
             silence_starts.append(i)
 
     # short circuit when there is no silence
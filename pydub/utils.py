@@ -1,10 +1,13 @@
 from __future__ import division
 from io import BufferedReader
 
+import copy
 import json
 import os
 import re
 import sys
+import threading
+from collections import OrderedDict
 from subprocess import Popen, PIPE
 from math import log, ceil
 from tempfile import TemporaryFile
@@ -22,16 +25,20 @@ if sys.version_info >= (3, 0):
 FRAME_WIDTHS = {
     8: 1,
     16: 2,
+    24: 3,
     32: 4,
 }
+# 24-bit samples are held in 32-bit ints
 ARRAY_TYPES = {
     8: "b",
     16: "h",
+    24: "i",
     32: "i",
 }
 ARRAY_RANGES = {
     8: (-0x80, 0x7f),
     16: (-0x8000, 0x7fff),
+    24: (-0x800000, 0x7fffff),
     32: (-0x80000000, 0x7fffffff),
 }
 
@@ -141,6 +148,8 @@ def make_chunks(audio_segment, chunk_length):
     segments back (except the last one, which can be shorter)
     """
     number_of_chunks = ceil(len(audio_segment) / float(chunk_length))
+    # the chunks share the original audio data rather than copying it
+    audio_segment = audio_segment.view()
     return [audio_segment[i * chunk_length:(i + 1) * chunk_length]
             for i in range(int(number_of_chunks))]
 
@@ -221,7 +230,7 @@ def fsdecode(filename):
     raise TypeError("type {0} not accepted by fsdecode".format(type(filename)))
 
 
-def get_extra_info(stderr):
+def get_extra_info(stderr, input_index=0):
     """
     avprobe sometimes gives more information on stderr than
     on the json output. The information has to be extracted
@@ -231,12 +240,15 @@ def get_extra_info(stderr):
     '    Stream #0:0: Audio: vorbis'
     '      44100 Hz, stereo, fltp, 320 kb/s'
 
+    The streams of the input_index-th input (when there are several) are
+    returned.
+
     :type stderr: str
     :rtype: list of dict
     """
     extra_info = {}
 
-    re_stream = r'(?P<space_start> +)Stream #0[:\.](?P<stream_id>([0-9]+))(?P<content_0>.+)\n?(?! *Stream)((?P<space_end> +)(?P<content_1>.+))?'
+    re_stream = r'(?P<space_start> +)Stream #' + str(input_index) + r'[:\.](?P<stream_id>([0-9]+))(?P<content_0>.+)\n?(?! *Stream)((?P<space_end> +)(?P<content_1>.+))?'
     for i in re.finditer(re_stream, stderr):
         if i.group('space_end') is not None and len(i.group('space_start')) <= len(
                 i.group('space_end')):
@@ -248,9 +260,151 @@ def get_extra_info(stderr):
     return extra_info
 
 
+def _parse_sample_format(token):
+    """
+    Returns (sample_fmt, bits_per_sample, bits_per_raw_sample) from a token
+    of a stream description (see get_extra_info()) like 's32 (24 bit)' or
+    'fltp', or None if the token doesn't describe the sample format.
+    """
+    m = re.match(r'([su]([0-9]{1,2})p?) \(([0-9]{1,2}) bit\)$', token)
+    m2 = re.match(r'([su]([0-9]{1,2})p?)( \(default\))?$', token)
+    if m:
+        return m.group(1), int(m.group(2)), int(m.group(3))
+    elif m2:
+        return m2.group(1), int(m2.group(2)), int(m2.group(2))
+    elif re.match(r'(flt)p?( \(default\))?$', token):
+        return token, 32, 32
+    elif re.match(r'(dbl)p?( \(default\))?$', token):
+        return token, 64, 64
+    return None
+
+
+def get_input_audio_info(stderr, input_index=0):
+    """
+    Returns the codec_name, sample_fmt and bits_per_sample (as a dict, like
+    the stream information of mediainfo_json()) of the first audio stream of
+    the input (the input_index-th one, when there are several) described in
+    the stderr output of an ffmpeg/avconv conversion, or None if there isn't
+    one.
+
+    :type stderr: str
+    :rtype: dict
+    """
+    # the stream mapping and the streams of the output come after the input
+    stderr = re.split(r'Stream mapping:|Output #0', stderr)[0]
+    for _, tokens in sorted(get_extra_info(stderr, input_index).items()):
+        if 'Audio' not in tokens[:-1]:
+            continue
+        codec_token = tokens[tokens.index('Audio') + 1]
+        info = {'codec_name': codec_token.split()[0]}
+        for token in tokens:
+            sample_format = _parse_sample_format(token)
+            if sample_format:
+                info['sample_fmt'], info['bits_per_sample'], _ = sample_format
+                break
+
+        # ffprobe reports the bits per sample of pcm codecs, not the sample
+        # format they're decoded to (24 bit samples are decoded to s32)
+        m = re.match(r'pcm_[su]([0-9]{1,2})', info['codec_name'])
+        if m:
+            info['bits_per_sample'] = int(m.group(1))
+        return info
+    return None
+
+
+# how many mediainfo_json() results are kept (see _mediainfo_cache_key())
+MEDIAINFO_CACHE_SIZE = 1024
+_mediainfo_cache = OrderedDict()
+_mediainfo_cache_lock = threading.Lock()
+
+
+def _mediainfo_cache_key(filepath):
+    """
+    Files given by path are identified by their path, modification time and
+    size, file objects aren't cached (returns None).
+    """
+    try:
+        path = fsdecode(filepath)
+        stat = os.stat(path)
+    except (TypeError, OSError):
+        return None
+    return (os.path.abspath(path), stat.st_mtime, stat.st_size)
+
+
 def mediainfo_json(filepath, read_ahead_limit=-1):
     """Return json dictionary with media info(codec, duration, size, bitrate...) from filepath
+
+    The results for files given by path are cached (until the file changes),
+    so each file is only probed once. Every call returns a new copy.
     """
+    key = _mediainfo_cache_key(filepath)
+    info = _cached_mediainfo(key)
+    if info is not None:
+        return info
+
+    info = _probe_json(filepath, read_ahead_limit)
+    _cache_mediainfo(key, info)
+    return info
+
+
+def _cached_mediainfo(key):
+    if key is None:
+        return None
+    with _mediainfo_cache_lock:
+        info = _mediainfo_cache.get(key)
+        if info is None:
+            return None
+        # most recently used last
+        del _mediainfo_cache[key]
+        _mediainfo_cache[key] = info
+    return copy.deepcopy(info)
+
+
+def _cache_mediainfo(key, info):
+    if key is None or not info:
+        return
+    with _mediainfo_cache_lock:
+        _mediainfo_cache[key] = copy.deepcopy(info)
+        while len(_mediainfo_cache) > MEDIAINFO_CACHE_SIZE:
+            _mediainfo_cache.popitem(last=False)
+
+
+def prewarm_mediainfo_cache(filepaths, max_workers=1):
+    """
+    Probes every file in filepaths which isn't cached yet, so that
+    mediainfo_json() (and so AudioSegment.from_file()) doesn't have to run
+    ffprobe for them later. With max_workers > 1 that many files are
+    probed at once.
+
+    Returns the number of files probed.
+    """
+    missing = OrderedDict()
+    for path in filepaths:
+        key = _mediainfo_cache_key(path)
+        if key is None:
+            continue
+        with _mediainfo_cache_lock:
+            cached = key in _mediainfo_cache
+        if not cached:
+            missing.setdefault(key, path)
+    missing = list(missing.values())
+
+    if max_workers > 1 and len(missing) > 1:
+        from concurrent.futures import ThreadPoolExecutor
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            list(executor.map(mediainfo_json, missing))
+    else:
+        for path in missing:
+            mediainfo_json(path)
+    return len(missing)
+
+
+def clear_mediainfo_cache():
+    with _mediainfo_cache_lock:
+        _mediainfo_cache.clear()
+
+
+def _probe_command(filepath, read_ahead_limit=-1):
     prober = get_prober_name()
     command_args = [
         "-v", "info",
@@ -275,8 +429,17 @@ def mediainfo_json(filepath, read_ahead_limit=-1):
             file.close()
 
     command = [prober, '-of', 'json'] + command_args
+    return command, stdin_parameter, stdin_data
+
+
+def _probe_json(filepath, read_ahead_limit=-1):
+    command, stdin_parameter, stdin_data = _probe_command(filepath, read_ahead_limit)
     res = Popen(command, stdin=stdin_parameter, stdout=PIPE, stderr=PIPE)
     output, stderr = res.communicate(input=stdin_data)
+    return _parse_probe_output(output, stderr)
+
+
+def _parse_probe_output(output, stderr):
     output = output.decode("utf-8", 'ignore')
     stderr = stderr.decode("utf-8", 'ignore')
 
@@ -303,24 +466,11 @@ def mediainfo_json(filepath, read_ahead_limit=-1):
             stream[prop] = value
 
     for token in extra_info[stream['index']]:
-        m = re.match(r'([su]([0-9]{1,2})p?) \(([0-9]{1,2}) bit\)$', token)
-        m2 = re.match(r'([su]([0-9]{1,2})p?)( \(default\))?$', token)
-        if m:
-            set_property(stream, 'sample_fmt', m.group(1))
-            set_property(stream, 'bits_per_sample', int(m.group(2)))
-            set_property(stream, 'bits_per_raw_sample', int(m.group(3)))
-        elif m2:
-            set_property(stream, 'sample_fmt', m2.group(1))
-            set_property(stream, 'bits_per_sample', int(m2.group(2)))
-            set_property(stream, 'bits_per_raw_sample', int(m2.group(2)))
-        elif re.match(r'(flt)p?( \(default\))?$', token):
-            set_property(stream, 'sample_fmt', token)
-            set_property(stream, 'bits_per_sample', 32)
-            set_property(stream, 'bits_per_raw_sample', 32)
-        elif re.match(r'(dbl)p?( \(default\))?$', token):
-            set_property(stream, 'sample_fmt', token)
-            set_property(stream, 'bits_per_sample', 64)
-            set_property(stream, 'bits_per_raw_sample', 64)
+        sample_format = _parse_sample_format(token)
+        if sample_format:
+            set_property(stream, 'sample_fmt', sample_format[0])
+            set_property(stream, 'bits_per_sample', sample_format[1])
+            set_property(stream, 'bits_per_raw_sample', sample_format[2])
     return info
 
 
@@ -426,6 +576,7 @@ def stereo_to_ms(audio_segment):
 	'''
 	Left-Right -> Mid-Side
 	'''
+	from .audio_segment import AudioSegment
 	channel = audio_segment.split_to_mono()
 	channel = [channel[0].overlay(channel[1]), channel[0].overlay(channel[1].invert_phase())]
 	return AudioSegment.from_mono_audiosegments(channel[0], channel[1])
@@ -434,6 +585,7 @@ def ms_to_stereo(audio_segment):
 	'''
 	Mid-Side -> Left-Right
 	'''
+	from .audio_segment import AudioSegment
 	channel = audio_segment.split_to_mono()
 	channel = [channel[0].overlay(channel[1]) - 3, channel[0].overlay(channel[1].invert_phase()) - 3]
 	return AudioSegment.from_mono_audiosegments(channel[0], channel[1])
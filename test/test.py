@@ -1,4 +1,5 @@
 from functools import partial
+import io
 import os
 import sys
 import unittest
@@ -8,15 +9,19 @@ from tempfile import (
     gettempdir
 )
 import tempfile
+import shutil
 import struct
 
-from pydub import AudioSegment
+from pydub import AudioSegment, effects, mixer, silence
 from pydub.audio_segment import extract_wav_headers
 from pydub.utils import (
     db_to_float,
     ratio_to_db,
     make_chunks,
     mediainfo,
+    mediainfo_json,
+    prewarm_mediainfo_cache,
+    clear_mediainfo_cache,
     get_encoder_name,
     get_supported_decoders,
     get_supported_encoders,
@@ -26,8 +31,21 @@ from pydub.exceptions import (
     InvalidID3TagVersion,
     InvalidDuration,
     CouldntDecodeError,
+    CouldntEncodeError,
     MissingAudioParameter,
 )
+from pydub.mixer import Mixer
+from pydub.cache import DecodeCache
+from pydub.pool import ConverterPool
+# importing scipy_effects replaces the filters of pydub.effects, which are
+# the ones the other tests use
+_effects_without_scipy = dict(vars(AudioSegment))
+try:
+    from pydub import scipy_effects
+except ImportError:
+    scipy_effects = None
+for _name in ('low_pass_filter', 'high_pass_filter'):
+    setattr(AudioSegment, _name, _effects_without_scipy[_name])
 from pydub.silence import (
     detect_silence,
     split_on_silence,
@@ -58,6 +76,23 @@ class UtilityTests(unittest.TestCase):
         self.assertEqual(3, db_to_float(ratio_to_db(3, using_amplitude=False), using_amplitude=False))
         self.assertEqual(12, ratio_to_db(db_to_float(12, using_amplitude=False), using_amplitude=False))
 
+    def test_mediainfo_json_cache(self):
+        mp3_path = os.path.join(data_dir, 'test1.mp3')
+        wav_path = os.path.join(data_dir, 'test1.wav')
+        clear_mediainfo_cache()
+
+        self.assertEqual(prewarm_mediainfo_cache([mp3_path, wav_path, mp3_path]), 2)
+        self.assertEqual(prewarm_mediainfo_cache([mp3_path, wav_path]), 0)
+
+        # cached results are copies, so changing one doesn't change the cache
+        info = mediainfo_json(mp3_path)
+        self.assertEqual(info['format']['format_name'], 'mp3')
+        info['format']['format_name'] = 'changed'
+        self.assertEqual(mediainfo_json(mp3_path)['format']['format_name'], 'mp3')
+
+        clear_mediainfo_cache()
+        self.assertEqual(prewarm_mediainfo_cache([mp3_path]), 1)
+
 
 if sys.version_info >= (3, 6):
     class PathLikeObjectTests(unittest.TestCase):
@@ -178,6 +213,130 @@ class FileAccessTests(unittest.TestCase):
         self.assertTrue(seg1._data == seg2._data)
         self.assertTrue(len(seg1) > 0)
 
+    def test_iter_file_mp3(self):
+        seg = AudioSegment.from_file(self.mp3_path)
+        chunks = list(AudioSegment.iter_file(self.mp3_path, chunk_ms=500))
+
+        self.assertTrue(len(chunks) > 1)
+        self.assertTrue(all(len(chunk) == 500 for chunk in chunks[:-1]))
+        self.assertEqual(b''.join(chunk._data for chunk in chunks), seg._data)
+
+    def test_from_file_without_probe(self):
+        seg = AudioSegment.from_file(self.mp3_path)
+        unprobed = AudioSegment.from_file(self.mp3_path, probe=False)
+
+        self.assertEqual(unprobed.sample_width, seg.sample_width)
+        self.assertEqual(unprobed.frame_rate, seg.frame_rate)
+        self.assertEqual(unprobed.channels, seg.channels)
+        self.assertEqual(len(unprobed.raw_data), len(seg.raw_data))
+        # decoding via 32-bit samples may round differently
+        self.assertTrue(seg.overlay(unprobed.invert_phase()).max <= 1)
+
+        # (wav files given as file objects without a format go through ffmpeg)
+        wav_path = os.path.join(data_dir, 'test1-24bit.wav')
+        with open(wav_path, 'rb') as f:
+            seg = AudioSegment.from_file(f, keep_24bit=True)
+        with open(wav_path, 'rb') as f:
+            unprobed = AudioSegment.from_file(f, probe=False, keep_24bit=True)
+        self.assertEqual(unprobed.sample_width, 3)
+        self.assertEqual(unprobed, seg)
+
+    def test_from_files(self):
+        wav_path = os.path.join(data_dir, 'test1.wav')
+        missing_path = os.path.join(data_dir, 'missing.mp3')
+        paths = [self.mp3_path, missing_path, wav_path, self.mp3_path]
+
+        results = list(AudioSegment.from_files(paths, max_workers=2))
+        self.assertEqual([result.source for result in results], paths)
+        self.assertEqual(results[0].segment, AudioSegment.from_file(self.mp3_path))
+        self.assertEqual(results[2].segment, AudioSegment.from_file(wav_path))
+        self.assertIsNone(results[1].segment)
+        self.assertIsInstance(results[1].error, Exception)
+        self.assertEqual([result.error for result in results if result.source != missing_path],
+                         [None, None, None])
+
+        results = AudioSegment.from_files(paths, max_workers=3, ordered=False, duration=1)
+        self.assertEqual(sorted(result.source for result in results), sorted(paths))
+
+    def test_converter_pool(self):
+        wav_path = os.path.join(data_dir, 'test1.wav')
+        missing_path = os.path.join(data_dir, 'missing.mp3')
+        paths = [self.mp3_path, missing_path, wav_path, self.mp3_path, self.mp3_path]
+
+        pool = ConverterPool(size=2, batch_size=3)
+        self.assertTrue(pool.check())
+
+        for probe in (True, False):
+            results = list(pool.from_files(paths, probe=probe, duration=2))
+            self.assertEqual([result.source for result in results], paths)
+            for result in results:
+                if result.source == missing_path:
+                    self.assertIsInstance(result.error, Exception)
+                else:
+                    self.assertEqual(result.segment,
+                                     AudioSegment.from_file(result.source, probe=probe, duration=2))
+
+        # batches don't run ffprobe for each of their files
+        import pydub.audio_segment
+        mediainfo_json = pydub.audio_segment.mediainfo_json
+        pydub.audio_segment.mediainfo_json = None
+        try:
+            results = list(pool.from_files([self.mp3_path] * 3, probe=False, duration=2))
+        finally:
+            pydub.audio_segment.mediainfo_json = mediainfo_json
+        self.assertEqual([result.error for result in results], [None, None, None])
+
+        segments = [results[0].segment, results[0].segment.set_sample_format('float32')
+                    if effects.np is not None else results[3].segment, results[2].segment]
+        jobs = [(segments[0], None, {'format': 'ogg'}),
+                (segments[1], None, {'format': 'mp3', 'bitrate': '64k'}),
+                (segments[2], None, {'format': 'wav'}),
+                (segments[0], None, {'format': 'not-a-format'})]
+        results = pool.export_many(jobs)
+        for result, segment, fmt in zip(results[:3], segments, ['ogg', 'mp3', 'wav']):
+            self.assertIsNone(result.error)
+            exported = AudioSegment.from_file(result.out_f, fmt)
+            self.assertAlmostEqual(len(exported), len(segment), delta=100)
+        self.assertIsInstance(results[3].error, CouldntEncodeError)
+
+    @unittest.skipIf(sys.version_info < (3, 5), "asyncio support requires python 3.5+")
+    def test_asyncio_support(self):
+        import asyncio
+        from pydub.asyncio_support import mediainfo_json_async
+        wav_path = os.path.join(data_dir, 'test1.wav')
+
+        loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(loop)
+        try:
+            seg, wav, info = loop.run_until_complete(asyncio.gather(
+                AudioSegment.from_file_async(self.mp3_path),
+                AudioSegment.from_file_async(wav_path),
+                mediainfo_json_async(self.mp3_path)))
+            self.assertEqual(seg, AudioSegment.from_file(self.mp3_path))
+            self.assertEqual(wav, AudioSegment.from_file(wav_path))
+            self.assertEqual(info['format']['format_name'], 'mp3')
+
+            with open(self.mp3_path, 'rb') as f:
+                from_fd = loop.run_until_complete(AudioSegment.from_file_async(f, duration=1))
+            self.assertEqual(len(from_fd), 1000)
+
+            exported = loop.run_until_complete(seg[:1000].export_async(format='mp3'))
+            self.assertAlmostEqual(len(AudioSegment.from_file(exported)), 1000, delta=100)
+
+            self.assertRaises(CouldntDecodeError, loop.run_until_complete,
+                              AudioSegment.from_file_async(io.BytesIO(b"not audio")))
+            self.assertRaises(CouldntEncodeError, loop.run_until_complete,
+                              seg.export_async(format='not-a-format'))
+        finally:
+            asyncio.set_event_loop(None)
+            loop.close()
+
+    def test_iter_file_stops_early(self):
+        chunks = AudioSegment.iter_file(self.mp3_path, chunk_ms=100)
+        first = next(chunks)
+        chunks.close()
+        self.assertEqual(len(first), 100)
+
 
 test1wav = test4wav = test1 = test2 = test3 = testparty = testdcoffset = None
 
@@ -244,6 +403,64 @@ class AudioSegmentTests(unittest.TestCase):
         # the data length should have grown by exactly 4:3 (24 bits turn into 32 bits)
         self.assertEqual(len(seg24.raw_data) * 3, len24 * 4)
 
+    def test_24_bit_audio_kept_native(self):
+        path24 = os.path.join(data_dir, 'test1-24bit.wav')
+        seg32 = AudioSegment.from_wav(path24)
+        seg24 = AudioSegment.from_wav(path24, keep_24bit=True)
+
+        self.assertEqual(seg24.sample_width, 3)
+        self.assertEqual(len(seg24.raw_data) * 4, len(seg32.raw_data) * 3)
+
+        # the samples are the same as the converted audio, minus the padding
+        samples = seg24.get_array_of_samples()
+        self.assertEqual(list(samples), [sample >> 8 for sample in seg32.get_array_of_samples()])
+        self.assertEqual(seg24._spawn(samples), seg24)
+
+        # operations keep the audio in 24-bit
+        for seg in [seg24[100:900] + 3, seg24.fade_in(200), seg24.set_channels(1),
+                    AudioSegment.from_mono_audiosegments(*seg24.split_to_mono())]:
+            self.assertEqual(seg.sample_width, 3)
+            self.assertEqual(len(seg.raw_data) % seg.frame_width, 0)
+        self.assertEqual(AudioSegment.from_mono_audiosegments(*seg24.split_to_mono()), seg24)
+
+        exported = AudioSegment.from_wav(seg24.export(format='wav'), keep_24bit=True)
+        self.assertEqual(exported, seg24)
+
+    @unittest.skipUnless(effects.np is not None, "numpy is not installed")
+    def test_float32_samples(self):
+        seg = self.seg1[:2000]
+        float_seg = seg.set_sample_format('float32')
+
+        self.assertEqual(float_seg.sample_format, 'float32')
+        self.assertEqual(float_seg.sample_width, 4)
+        self.assertEqual(float_seg.array_type, 'f')
+        self.assertAlmostEqual(float_seg.dBFS, seg.dBFS, places=2)
+        self.assertAlmostEqual(float_seg.max_dBFS, seg.max_dBFS, places=3)
+
+        # converting back is lossless
+        self.assertEqual(float_seg.set_sample_format('int').set_sample_width(seg.sample_width), seg)
+
+        # float samples aren't clipped along a chain of effects
+        loud = (float_seg + 20).fade_in(500).overlay(float_seg, position=200)
+        self.assertGreater(loud.max, 1.0)
+        restored = (float_seg + 20) - 20
+        self.assertAlmostEqual(restored.max, float_seg.max, places=5)
+        self.assertLess(((seg + 20) - 20).max, seg.max)
+
+        # operations, and mixing with int segments, keep float samples
+        for result in [seg.append(float_seg, crossfade=100), seg.overlay(float_seg),
+                       float_seg.set_channels(1), float_seg.set_frame_rate(22050),
+                       float_seg.lazy().apply_gain(6).render(), float_seg.low_pass_filter(1000),
+                       Mixer(float_seg).add(seg).render()]:
+            self.assertEqual(result.sample_format, 'float32')
+
+        # and it's only quantised when it's exported
+        exported = AudioSegment.from_wav((float_seg - 6).export(format='wav'))
+        self.assertEqual(exported.sample_width, 4)
+        self.assertAlmostEqual(exported.dBFS, (seg - 6).dBFS, places=2)
+
+        self.assertRaises(ValueError, seg.set_sample_format, 'float64')
+
     def test_8_bit_audio(self):
         original_path = os.path.join(data_dir,'test1.wav')
         original_segment = AudioSegment.from_file(original_path)
@@ -313,6 +530,23 @@ class AudioSegmentTests(unittest.TestCase):
         s2 = self.seg2[:500]
         self.assertRaises(ValueError, lambda: s1.append(s2, crossfade=len(s1) + 10))
 
+    def test_concatenate(self):
+        chunks = make_chunks(self.seg1[:3000], 150)
+
+        self.assertEqual(AudioSegment.concatenate(chunks), sum(chunks))
+
+        appended = chunks[0]
+        for chunk in chunks[1:]:
+            appended = appended.append(chunk, crossfade=25)
+        self.assertEqual(AudioSegment.concatenate(chunks, crossfade=25), appended)
+
+        # formats are synced like append() does
+        mono = self.seg2[:500].set_channels(1).set_frame_rate(8000)
+        self.assertEqual(AudioSegment.concatenate([chunks[0], mono]), chunks[0] + mono)
+
+        self.assertRaises(ValueError, AudioSegment.concatenate, [])
+        self.assertRaises(ValueError, AudioSegment.concatenate, chunks, crossfade=200)
+
     def test_sum(self):
         def gen():
             yield self.seg1
@@ -640,6 +874,41 @@ class AudioSegmentTests(unittest.TestCase):
         with self.assertRaises(AttributeError):
             seg.export(format='raw', parameters=['-ar', '16000', '-ac', '1'])
 
+    def test_export_segments_as_mp3(self):
+        seg = self.seg1
+        chunks = [seg.get_sample_slice(0, 100000), seg.get_sample_slice(100000)]
+        exported = AudioSegment.from_mp3(AudioSegment.export_segments(chunks, format='mp3'))
+        self.assertWithinTolerance(len(exported), len(seg), percentage=0.01)
+
+    def test_export_segments_matches_formats(self):
+        mono = self.seg1[:1000].set_channels(1)
+        exported = AudioSegment.export_segments([self.seg1[:1000], mono], format='ogg')
+        seg_exported = AudioSegment.from_ogg(exported)
+        self.assertEqual(seg_exported.channels, 2)
+        self.assertWithinTolerance(len(seg_exported), 2000, percentage=0.01)
+
+    def test_export_segments_as_raw_with_codec(self):
+        with self.assertRaises(AttributeError):
+            AudioSegment.export_segments([self.seg1], format='raw', codec='pcm_s32le')
+
+    def test_export_many(self):
+        seg = self.seg1[:2000]
+        with NamedTemporaryFile('w+b', suffix='.mp3') as tmp_mp3_file:
+            jobs = [(seg, tmp_mp3_file, {'format': 'mp3'}),
+                    (seg, None, {'format': 'not_a_format'}),
+                    (seg.set_channels(1), None)]
+            results = AudioSegment.export_many(iter(jobs), max_workers=2, max_pending=1)
+
+            self.assertEqual([result.error for result in results[::2]], [None, None])
+            self.assertIsInstance(results[1].error, CouldntEncodeError)
+            self.assertTrue(all(result.seconds >= 0 for result in results))
+
+            self.assertIs(results[0].out_f, tmp_mp3_file)
+            tmp_mp3_file.seek(0)
+            self.assertWithinTolerance(len(AudioSegment.from_mp3(tmp_mp3_file)), 2000,
+                                       percentage=0.05)
+            self.assertEqual(AudioSegment.from_mp3(results[2].out_f).channels, 1)
+
     def test_export_as_ogg(self):
         seg = self.seg1
         exported_ogg = seg.export(format='ogg')
@@ -699,6 +968,51 @@ class AudioSegmentTests(unittest.TestCase):
         db_at_end = ratio_to_db(fade_out[-1000:].rms, seg[-1000:].rms)
         self.assertTrue(db_at_end < db_at_beginning)
 
+    def test_fade_curves(self):
+        seg = AudioSegment(b'\x00\x40' * 44100, sample_width=2, frame_rate=44100, channels=1)
+
+        fades = {}
+        for curve in ('linear', 'log', 'equal_power'):
+            fade_in = seg.fade_in(1000, curve=curve)
+            self.assertEqual(len(fade_in.raw_data), len(seg.raw_data))
+
+            # every sample gets louder
+            samples = fade_in.get_array_of_samples()
+            self.assertTrue(all(a <= b for a, b in zip(samples, samples[1:])))
+            self.assertEqual(samples[0], 0)
+            fades[curve] = samples
+
+        middle = len(seg.raw_data) // 4
+        self.assertTrue(fades['log'][middle] < fades['linear'][middle] < fades['equal_power'][middle])
+
+        self.assertRaises(ValueError, partial(seg.fade_in, 1000, curve='cubic'))
+
+    def test_fade_without_numpy(self):
+        import pydub.audio_segment
+        seg = self.seg1[:3000]
+        numpy = pydub.audio_segment.np
+        fades = [seg.fade_in(2000), seg.fade_out(50), seg.fade(to_gain=3, start=10, end=-10, curve='log')]
+        pydub.audio_segment.np = None
+        try:
+            # fades longer than 100ms change the gain once per millisecond
+            fade_in = seg.fade_in(2000)
+            self.assertWithinTolerance(fade_in.rms, fades[0].rms, percentage=0.01)
+            self.assertEqual(fades[1].raw_data, seg.fade_out(50).raw_data)
+            self.assertWithinTolerance(seg.fade(to_gain=3, start=10, end=-10, curve='log').rms,
+                                       fades[2].rms, percentage=0.01)
+        finally:
+            pydub.audio_segment.np = numpy
+
+    def test_fade_view(self):
+        seg = self.seg1[:3000]
+        view = seg.view()
+
+        self.assertEqual(view.fade_in(500), seg.fade_in(500))
+        self.assertEqual(view.fade_out(50), seg.fade_out(50))
+        self.assertEqual(view[:1000].append(view[1000:]), seg[:1000].append(seg[1000:]))
+        self.assertEqual(AudioSegment.concatenate([view, view], crossfade=100),
+                         seg.append(seg, crossfade=100))
+
     def test_reverse(self):
         seg = self.seg1
         rseg = seg.reverse()
@@ -973,6 +1287,30 @@ class AudioSegmentTests(unittest.TestCase):
         # average volume should be reduced
         self.assertTrue(compressed.rms < self.seg1.rms)
 
+    @unittest.skipUnless(effects.np is not None, "numpy is not installed")
+    def test_compress_numpy_matches_python(self):
+        seg = self.seg1[:3000]
+        compressed = seg.compress_dynamic_range(threshold=-30.0)
+
+        numpy, effects.np = effects.np, None
+        try:
+            expected = seg.compress_dynamic_range(threshold=-30.0)
+        finally:
+            effects.np = numpy
+
+        self.assertEqual(compressed, expected)
+
+    def test_compress_without_attack_or_release(self):
+        seg = self.seg1[:500]
+        numpy = effects.np
+        for np_module in (numpy, None):
+            effects.np = np_module
+            try:
+                self.assertRaises(ZeroDivisionError, seg.compress_dynamic_range, attack=0)
+                self.assertRaises(ZeroDivisionError, seg.compress_dynamic_range, release=0)
+            finally:
+                effects.np = numpy
+
     @unittest.skipUnless('aac' in get_supported_decoders(),
                          "Unsupported codecs")
     def test_exporting_to_ogg_uses_default_codec_when_codec_param_is_none(self):
@@ -995,6 +1333,95 @@ class AudioSegmentTests(unittest.TestCase):
     def test_zero_length_segment(self):
         self.assertEqual(0, len(self.seg1[0:0]))
 
+    def test_view(self):
+        seg = self.seg1
+        view = seg.view()
+
+        # audioop can't operate on memoryviews on python 2
+        if sys.version_info[0] == 2:
+            self.assertIs(view, seg)
+        else:
+            self.assertIsInstance(view._data, memoryview)
+        self.assertEqual(view, seg)
+        self.assertEqual(hash(view), hash(seg))
+        self.assertEqual(view.raw_data, seg.raw_data)
+        self.assertIsInstance(view.raw_data, bytes)
+
+        # slices of a view are views themselves
+        view_slice = view[1000:2000]
+        if sys.version_info[0] != 2:
+            self.assertIsInstance(view_slice._data, memoryview)
+        self.assertEqual(view_slice, seg[1000:2000])
+        self.assertEqual(view.get_sample_slice(10, 20), seg.get_sample_slice(10, 20))
+
+        self.assertEqual(view_slice + view_slice, seg[1000:2000] * 2)
+        self.assertEqual(view_slice.overlay(seg), seg[1000:2000].overlay(seg))
+        self.assertEqual(view_slice.get_array_of_samples(), seg[1000:2000].get_array_of_samples())
+        self.assertEqual(len(view[-1:]), 1)
+
+    def test_view_slices_with_audioop(self):
+        seg = self.seg1[:1000]
+        chunks = make_chunks(seg, 100)
+
+        self.assertEqual(chunks[0] + chunks[1], seg[:200])
+        self.assertEqual(chunks[0] + 3, seg[:100] + 3)
+        self.assertEqual(chunks[0].fade_in(50), seg[:100].fade_in(50))
+        self.assertEqual(chunks[0].append(chunks[1], crossfade=50),
+                         seg[:100].append(seg[100:200], crossfade=50))
+        self.assertEqual(seg.view().reverse(), seg.reverse())
+
+    def test_lazy(self):
+        a = self.seg1[:3000]
+        b = self.seg2[2000:4500]
+        mono = self.seg3[:1200].set_channels(1)
+
+        # without fusing gains the results are identical
+        operations = [
+            lambda seg: seg + b,
+            lambda seg: seg.append(b, crossfade=300),
+            lambda seg: seg.append(mono, crossfade=500),
+            lambda seg: seg[100:2000][5:-7],
+            lambda seg: seg.apply_gain(-3.5),
+            lambda seg: seg.fade(to_gain=4, start=100, end=-100, curve='log'),
+            lambda seg: seg.overlay(b[:400], position=250, times=3, gain_during_overlay=-6),
+            lambda seg: seg * b[:333],
+            lambda seg: (seg + b).fade_in(100).overlay(mono, position=1000),
+        ]
+        for operation in operations:
+            expected = operation(a)
+            lazy = operation(a.lazy())
+            self.assertEqual(len(lazy), len(expected))
+            self.assertEqual(lazy.render(), expected)
+            self.assertEqual(lazy.raw_data, expected.raw_data)
+            self.assertEqual(b''.join(chunk.raw_data for chunk in lazy.iter_chunks(37)),
+                             expected.raw_data)
+
+        self.assertEqual(mono.lazy().overlay(a).render(), mono.overlay(a))
+
+    def test_lazy_24_bit(self):
+        seg24 = AudioSegment.from_wav(os.path.join(data_dir, 'test1-24bit.wav'), keep_24bit=True)
+
+        lazy = seg24.lazy()[100:900] + seg24[2000:2500]
+        expected = seg24[100:900] + seg24[2000:2500]
+        rendered = lazy.render()
+        self.assertEqual(rendered.sample_width, 3)
+        self.assertEqual(rendered, expected)
+        for chunk in lazy.iter_chunks(100):
+            self.assertEqual(chunk.sample_width, 3)
+
+    def test_lazy_fuses_gains(self):
+        seg = self.seg1[:3000]
+        lazy = seg.lazy().fade_in(400).apply_gain(-3).fade_out(300) + 1
+        self.assertEqual(len(lazy._node.steps), 4)
+
+        expected = seg.fade_in(400).apply_gain(-3).fade_out(300) + 1
+        rendered = lazy.render()
+        self.assertEqual(len(rendered.raw_data), len(expected.raw_data))
+        # rounded once, rather than after each of the 4 steps
+        for expected_sample, sample in zip(expected.get_array_of_samples(),
+                                           rendered.get_array_of_samples()):
+            self.assertTrue(abs(expected_sample - sample) <= 4)
+
     def test_invert(self):
         s_mono = Sine(100).to_audio_segment()
         s = s_mono.set_channels(2)
@@ -1145,6 +1572,25 @@ class SilenceTests(unittest.TestCase):
                                        seek_step=10)
         self.assertEqual(silent_ranges, [[0, 770], [3150, 4030], [5520, 6050]])
 
+    def test_slice_rms_matches_slicing(self):
+        # 44.1 frames per ms, so slices don't line up with whole frames
+        seg = self.seg1[:3000].set_frame_rate(44100)
+
+        def check():
+            slice_rms = silence._slice_rms(seg)
+            for start, end in [(0, 3000), (0, 1), (7, 7), (13, 1013), (1999, 3000)]:
+                self.assertEqual(slice_rms(start, end), seg[start:end].rms)
+
+            silent_ranges = detect_silence(seg, min_silence_len=300, silence_thresh=-20)
+            self.assertEqual(silent_ranges, [[0, 869], [1766, 2162], [2258, 2621]])
+
+        check()
+        numpy, silence.np = silence.np, None
+        try:
+            check()
+        finally:
+            silence.np = numpy
+
     def test_realistic_audio(self):
         silent_ranges = detect_silence(self.seg4, min_silence_len=1000, silence_thresh=self.seg4.dBFS)
 
@@ -1154,6 +1600,96 @@ class SilenceTests(unittest.TestCase):
             prev_end = end
 
 
+class MixerTests(unittest.TestCase):
+
+    def setUp(self):
+        global test1wav
+        if not test1wav:
+            test1wav = AudioSegment.from_wav(os.path.join(data_dir, 'test1.wav'))
+
+        self.base = test1wav - 12
+        self.seg = test1wav[2000:2600] - 10
+
+    def test_matches_overlay(self):
+        base, seg = self.base, self.seg
+        mixer = Mixer(base)
+        mixer.add(seg, 100).add(seg, 500, gain=-3).add(seg[:200], -900, times=3)
+        mixer.add(seg[:150], 7000, loop=True)
+
+        overlaid = base.overlay(seg, 100).overlay(seg.apply_gain(-3), 500)
+        overlaid = overlaid.overlay(seg[:200], -900, times=3).overlay(seg[:150], 7000, loop=True)
+
+        mixed = mixer.render()
+        self.assertEqual(len(mixed.raw_data), len(base.raw_data))
+        # overlay() may drop the last few frames
+        self.assertEqual(mixed.raw_data[:len(overlaid.raw_data)], overlaid.raw_data)
+        self.assertEqual(b''.join(chunk.raw_data for chunk in mixer.iter_chunks(77)),
+                         mixed.raw_data)
+
+    def test_without_base(self):
+        mixed = Mixer().add(self.seg).add(self.seg, 300).render()
+        self.assertEqual(len(mixed), 900)
+        self.assertEqual(mixed[:600], self.seg.overlay(self.seg, 300))
+
+        self.assertRaises(ValueError, Mixer().add, self.seg, -100)
+        self.assertEqual(len(Mixer().render()), 0)
+
+    def test_clips_once(self):
+        loud = self.base + 18
+        mixed = Mixer(loud).add(loud).add(loud.invert_phase()).render()
+        if mixer.np is not None:
+            self.assertEqual(mixed, loud)
+        else:
+            self.assertEqual(mixed, loud.overlay(loud).overlay(loud.invert_phase()))
+
+
+class DecodeCacheTests(unittest.TestCase):
+
+    def setUp(self):
+        self.cache_dir = mkdtemp()
+        self.mp3_path = os.path.join(data_dir, 'test1.mp3')
+
+    def tearDown(self):
+        shutil.rmtree(self.cache_dir)
+
+    def test_cached_decode(self):
+        cache = DecodeCache(self.cache_dir)
+        decoded = AudioSegment.from_file(self.mp3_path)
+
+        seg1 = AudioSegment.from_file(self.mp3_path, cache=cache)
+        seg2 = AudioSegment.from_file(self.mp3_path, cache=cache)
+        self.assertEqual((cache.hits, cache.misses), (1, 1))
+        self.assertEqual(seg1, decoded)
+        self.assertEqual(seg2, decoded)
+        self.assertEqual(seg2.frame_rate, decoded.frame_rate)
+        self.assertEqual(seg2.sample_width, decoded.sample_width)
+
+        # other decode parameters are cached separately
+        part = cache.from_file(self.mp3_path, start_second=1, duration=2)
+        self.assertEqual(len(part), 2000)
+        self.assertEqual(cache.misses, 2)
+
+        # file objects aren't cached
+        with open(self.mp3_path, 'rb') as f:
+            self.assertEqual(cache.from_file(f, format='mp3'), decoded)
+        self.assertEqual((cache.hits, cache.misses), (1, 2))
+
+    def test_eviction(self):
+        cache = DecodeCache(self.cache_dir)
+        cache.from_file(self.mp3_path)
+        cache.from_file(self.mp3_path, duration=1)
+        self.assertEqual(len(os.listdir(self.cache_dir)), 2)
+
+        # the least recently used file is removed first
+        cache.evict(cache.size() - 1)
+        self.assertEqual(len(os.listdir(self.cache_dir)), 1)
+        cache.from_file(self.mp3_path, duration=1)
+        self.assertEqual(cache.hits, 1)
+
+        cache.clear()
+        self.assertEqual(os.listdir(self.cache_dir), [])
+
+
 class GeneratorTests(unittest.TestCase):
 
     def test_with_smoke(self):
@@ -1211,6 +1747,21 @@ class NoConverterTests(unittest.TestCase):
         seg = AudioSegment.from_file(self.wave_file, format="wav")
         self.assertTrue(len(seg) > 1000)
 
+    def test_opening_wav_file_with_mmap(self):
+        seg = AudioSegment.from_wav(self.wave_file)
+        mapped = AudioSegment.from_wav(self.wave_file, mmap=True)
+
+        if sys.version_info[0] != 2:
+            self.assertIsInstance(mapped._data, memoryview)
+        self.assertEqual(mapped, seg)
+        self.assertEqual(mapped[1000:2000], seg[1000:2000])
+
+        mapped = AudioSegment.from_file(self.wave24_file, mmap=True)
+        self.assertEqual(mapped, AudioSegment.from_file(self.wave24_file))
+
+        mapped = AudioSegment.from_file(self.wave_empty, mmap=True)
+        self.assertEqual(len(mapped), 0)
+
     def test_opening_wav24_file(self):
         seg = AudioSegment.from_wav(self.wave24_file)
         self.assertTrue(len(seg) > 1000)
@@ -1234,6 +1785,22 @@ class NoConverterTests(unittest.TestCase):
         seg = AudioSegment.from_file(self.raw_file, format="raw", sample_width=2, frame_rate=32000, channels=2)
         self.assertTrue(len(seg) > 1000)
 
+    def test_iter_wav_file(self):
+        seg = AudioSegment.from_wav(self.wave_file)
+        chunks = list(AudioSegment.iter_file(self.wave_file, chunk_ms=1000))
+
+        self.assertEqual(len(chunks), 11)
+        self.assertEqual(len(chunks[-1]), 9)
+        self.assertEqual(b''.join(chunk._data for chunk in chunks), seg._data)
+
+        partial = AudioSegment.iter_file(self.wave_file, chunk_ms=300, start_second=1, duration=2)
+        self.assertEqual(b''.join(chunk._data for chunk in partial), seg[1000:3000]._data)
+
+    def test_iter_raw_file(self):
+        seg = AudioSegment.from_raw(self.raw_file, sample_width=2, frame_rate=32000, channels=2)
+        chunks = AudioSegment.iter_file(self.raw_file, format="raw", sample_width=2, frame_rate=32000, channels=2)
+        self.assertEqual(b''.join(chunk._data for chunk in chunks), seg._data)
+
     def test_opening_raw_file_with_missing_args_fails(self):
         func = partial(AudioSegment.from_raw, self.raw_file)
         self.assertRaises(KeyError, func)
@@ -1280,6 +1847,23 @@ class NoConverterTests(unittest.TestCase):
 
         self.assertEqual(len(exported), len(seg))
 
+    def test_exporting_segments(self):
+        seg = AudioSegment.from_wav(self.wave_file)
+        chunks = [seg.get_sample_slice(0, 1000), seg.get_sample_slice(1000)]
+
+        exported = AudioSegment.from_wav(AudioSegment.export_segments(chunks, format="wav"))
+        self.assertEqual(exported, seg)
+
+        exported = AudioSegment.export_segments(iter(chunks), format="raw")
+        self.assertEqual(exported.read(), seg.raw_data)
+
+    def test_exporting_lazy_segment(self):
+        seg = AudioSegment.from_wav(self.wave_file)
+        lazy = (seg.lazy() + seg).fade_out(500)
+
+        exported = AudioSegment.from_wav(lazy.export(format="wav", chunk_ms=300))
+        self.assertEqual(exported, (seg + seg).fade_out(500))
+
     def test_opening_empty_wav_file(self):
         seg = AudioSegment.from_wav(self.wave_empty)
         self.assertTrue(len(seg) == 0)
@@ -1330,6 +1914,142 @@ class FilterTests(unittest.TestCase):
         less_treble = s.low_pass_filter(800)
         self.assertAlmostEqual(less_treble.dBFS, s.dBFS, places=0)
 
+    def test_apply_mono_filter_to_each_channel(self):
+        seg = self.seg1[:1000]
+        left, right = seg.split_to_mono()
+        expected = AudioSegment.from_mono_audiosegments(left + 3, right + 3)
+
+        for max_workers in (1, 2):
+            louder = seg.apply_mono_filter_to_each_channel(lambda channel: channel + 3, max_workers)
+            self.assertEqual(louder._data, expected._data)
+
+        # channels which come back shorter only replace the start
+        shorter = seg.apply_mono_filter_to_each_channel(lambda channel: channel[:500].invert_phase())
+        self.assertEqual(shorter[:500]._data, seg[:500].invert_phase()._data)
+        self.assertEqual(shorter[500:]._data, seg[500:]._data)
+
+    @unittest.skipUnless(effects.np is not None, "numpy is not installed")
+    def test_filters_numpy_match_python(self):
+        seg = self.seg1[:2000]
+        segs = [seg, seg.set_sample_width(1), seg.set_sample_width(4)]
+        filtered = [[s.low_pass_filter(1000), s.high_pass_filter(1000)] for s in segs]
+
+        numpy, effects.np = effects.np, None
+        try:
+            expected = [[s.low_pass_filter(1000), s.high_pass_filter(1000)] for s in segs]
+        finally:
+            effects.np = numpy
+
+        for actual, python in zip(sum(filtered, []), sum(expected, [])):
+            self.assertEqual(actual.sample_width, python.sample_width)
+            # floating point rounding may differ in the last bit
+            differences = [abs(a - b) for a, b in zip(actual.get_array_of_samples(),
+                                                       python.get_array_of_samples())]
+            self.assertLessEqual(max(differences), 1)
+
+    @unittest.skipUnless(scipy_effects is not None, "scipy is not installed")
+    def test_butterworth_filter_in_chunks(self):
+        seg = self.seg1[:3000]
+        for s in [seg, seg.set_sample_width(1), seg.set_sample_width(3), seg.set_sample_format('float32')]:
+            whole = scipy_effects.ButterworthFilter(1000, 'lowpass')(s)
+
+            lowpass = scipy_effects.ButterworthFilter(1000, 'lowpass')
+            chunked = sum(lowpass(chunk) for chunk in make_chunks(s, 700))
+            self.assertEqual(chunked._data, whole._data)
+
+            # the state of the previous segment is forgotten
+            lowpass.reset()
+            self.assertEqual(lowpass(s)._data, whole._data)
+
+        lowpass = scipy_effects.ButterworthFilter(1000, 'lowpass')
+        lowpass(seg)
+        self.assertRaises(ValueError, lowpass, seg.set_channels(1))
+
+    @unittest.skipUnless(scipy_effects is not None, "scipy is not installed")
+    def test_butterworth_filter_clips(self):
+        # the filter's overshoot used to wrap around to the other extreme
+        s = Square(200).to_audio_segment(volume=0)
+        less_bass = scipy_effects.high_pass_filter(s, 2000)
+
+        sos = scipy_effects.ButterworthFilter(2000, 'highpass').sos(s.frame_rate)
+        unclipped = scipy_effects.sosfilt(sos, s.get_array_of_samples())
+        self.assertGreater(unclipped.max(), s.max_possible_amplitude)
+        expected = unclipped.clip(-s.max_possible_amplitude, s.max_possible_amplitude - 1)
+        self.assertEqual(list(less_bass.get_array_of_samples()), [int(x) for x in expected])
+
+    @unittest.skipUnless(scipy_effects is not None, "scipy is not installed")
+    def test_butter_cache(self):
+        seg = self.seg1[:100]
+        scipy_effects.clear_butter_cache()
+        # both channels use the same design
+        expected = scipy_effects.high_pass_filter(seg, 1000)
+        self.assertEqual(scipy_effects.butter_cache_info(),
+                         (1, 1, scipy_effects.BUTTER_CACHE_SIZE, 1))
+
+        self.assertEqual(scipy_effects.high_pass_filter(seg, 1000)._data, expected._data)
+        self.assertEqual(scipy_effects.butter_cache_info().hits, 3)
+
+        size = scipy_effects.BUTTER_CACHE_SIZE
+        scipy_effects.BUTTER_CACHE_SIZE = 2
+        try:
+            for freq in (500, 2000, 4000):
+                scipy_effects.low_pass_filter(seg, freq)
+            self.assertEqual(scipy_effects.butter_cache_info().currsize, 2)
+        finally:
+            scipy_effects.BUTTER_CACHE_SIZE = size
+
+        scipy_effects.clear_butter_cache()
+        self.assertEqual(scipy_effects.butter_cache_info(), (0, 0, size, 0))
+
+    @unittest.skipUnless(scipy_effects is not None, "scipy is not installed")
+    def test_eq_bands(self):
+        s100 = Sine(100).to_audio_segment(volume=-12)
+        s1k = Sine(1000).to_audio_segment(volume=-12)
+
+        def gain(equalized, original):
+            # skip the filter's transient
+            return equalized[200:].dBFS - original[200:].dBFS
+
+        self.assertAlmostEqual(gain(s1k.eq(1000, 200, gain_dB=6), s1k), 6, places=1)
+        self.assertAlmostEqual(gain(s100.eq(1000, 200, gain_dB=6), s100), 0, places=1)
+        self.assertAlmostEqual(gain(s100.eq(1000, filter_mode="low_shelf", gain_dB=-6), s100), -6, places=1)
+        self.assertAlmostEqual(gain(s100.eq(1000, filter_mode="high_shelf", gain_dB=-6), s100), 0, places=1)
+
+        bands = [scipy_effects.EQBand(1000, 6), (100, -6, "low_shelf"), {"focus_freq": 5000, "gain_dB": 3}]
+        equalized = s1k.parametric_eq(bands)
+        self.assertAlmostEqual(gain(equalized, s1k), 6, places=0)
+
+        # all the bands are applied in one pass, in chunks too
+        parametric_eq = scipy_effects.ParametricEQ(bands)
+        self.assertEqual(sum(parametric_eq(chunk) for chunk in make_chunks(s1k, 300))._data, equalized._data)
+
+        self.assertRaises(ValueError, s1k.eq, 1000, filter_mode="notch")
+        self.assertRaises(ValueError, s1k.eq, 1000, channel_mode="X")
+        self.assertRaises(ValueError, s1k.eq, 30000)
+
+    @unittest.skipUnless(scipy_effects is not None, "scipy is not installed")
+    def test_eq_channel_modes(self):
+        s100 = Sine(100).to_audio_segment(volume=-12)
+        s1k = Sine(1000).to_audio_segment(volume=-12)
+        stereo = AudioSegment.from_mono_audiosegments(s1k, s100)
+
+        left, right = stereo.eq(1000, 200, channel_mode="L", gain_dB=6).split_to_mono()
+        self.assertEqual(left._data, s1k.eq(1000, 200, gain_dB=6)._data)
+        self.assertEqual(right._data, s100._data)
+
+        left, right = stereo.eq(1000, 200, channel_mode="R", gain_dB=6).split_to_mono()
+        self.assertEqual(left._data, s1k._data)
+
+        # the same filter on mid and side is the same filter on left and right
+        mid_side = stereo.eq(1000, 200, channel_mode="M+S", gain_dB=6).get_array_of_samples()
+        left_right = stereo.eq(1000, 200, channel_mode="L+R", gain_dB=6).get_array_of_samples()
+        self.assertLessEqual(max(abs(a - b) for a, b in zip(mid_side, left_right)), 1)
+
+        # the side of a mono recording is silent
+        dual_mono = AudioSegment.from_mono_audiosegments(s1k, s1k)
+        self.assertEqual(dual_mono.eq(1000, channel_mode="S", gain_dB=6)._data, dual_mono._data)
+        self.assertNotEqual(dual_mono.eq(1000, channel_mode="M", gain_dB=6)._data, dual_mono._data)
+
 
 class PartialAudioSegmentLoadTests(unittest.TestCase):
 
@@ -1359,6 +2079,12 @@ class PartialAudioSegmentLoadTests(unittest.TestCase):
         self.assertEqual(len(partial_seg1), len(partial_seg2))
         self.assertEqual(partial_seg1._data, partial_seg2._data)
 
+    def test_partial_load_fast_seek_equals_cropped_mp3_audio_segment(self):
+        partial_seg1 = AudioSegment.from_file(self.mp3_path_str)[2500:3500]
+        partial_seg2 = AudioSegment.from_file(self.mp3_path_str, start_second=2.5, duration=1., fast_seek=True)
+        self.assertEqual(len(partial_seg1), len(partial_seg2))
+        self.assertEqual(partial_seg1._data, partial_seg2._data)
+
     def test_partial_load_duration_equals_cropped_wav_audio_segment(self):
         partial_seg1 = AudioSegment.from_file(self.wave_path_str)[:1000]
         partial_seg2 = AudioSegment.from_file(self.wave_path_str, duration=1.)
@@ -1377,6 +2103,35 @@ class PartialAudioSegmentLoadTests(unittest.TestCase):
         self.assertEqual(len(partial_seg1), len(partial_seg2))
         self.assertEqual(partial_seg1._data, partial_seg2._data)
 
+    def test_partial_load_wav_sample_widths(self):
+        for name in ['test1-8bit.wav', 'test1-24bit.wav']:
+            path = os.path.join(data_dir, name)
+            for keep_24bit in (False, True):
+                seg = AudioSegment.from_file(path, keep_24bit=keep_24bit)
+                with open(path, 'rb') as f:
+                    partial_seg = AudioSegment.from_file(f, format='wav', start_second=0.25, duration=0.5,
+                                                         keep_24bit=keep_24bit)
+                self.assertEqual(seg[250:750].raw_data, partial_seg.raw_data)
+                self.assertEqual(seg.sample_width, partial_seg.sample_width)
+
+                start_second = len(seg) / 1000. - 0.5
+                partial_seg = AudioSegment.from_file(path, start_second=start_second, keep_24bit=keep_24bit)
+                self.assertEqual(seg[start_second * 1000:].raw_data, partial_seg.raw_data)
+
+    def test_partial_load_invalid_range(self):
+        raw_kwargs = dict(format="raw", sample_width=2, frame_rate=32000, channels=2)
+        self.assertRaises(ValueError, AudioSegment.from_file, self.wave_path_str, start_second=-1.)
+        self.assertRaises(ValueError, AudioSegment.from_file, self.wave_path_str, start_second=1., duration=-1.)
+        self.assertRaises(ValueError, AudioSegment.from_file, self.raw_path_str, start_second=-1., **raw_kwargs)
+        self.assertRaises(ValueError, lambda: list(AudioSegment.iter_file(self.wave_path_str, start_second=-1.)))
+
+        # ranges past the end are cut short, like slices
+        seg = AudioSegment.from_file(self.wave_path_str)
+        partial_seg = AudioSegment.from_file(self.wave_path_str, start_second=len(seg) / 1000. - 0.5, duration=5.)
+        self.assertEqual(partial_seg.raw_data, seg[len(seg) - 500:len(seg) + 4500].raw_data)
+        partial_seg = AudioSegment.from_file(self.wave_path_str, start_second=len(seg) / 1000. + 1)
+        self.assertEqual(len(partial_seg), 0)
+
     def test_partial_load_duration_equals_cropped_raw_audio_segment(self):
         partial_seg1 = AudioSegment.from_file(self.raw_path_str, format="raw", sample_width=2, frame_rate=32000, channels=2)[:1000]
         partial_seg2 = AudioSegment.from_file(self.raw_path_str, format="raw", sample_width=2, frame_rate=32000, channels=2, duration=1.)